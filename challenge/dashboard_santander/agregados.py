@@ -0,0 +1,74 @@
+import pandas as pd
+
+NIVEIS_CUBO = ['ID_PGTO', 'ID_RCBE', 'MES_ANO']
+
+# --- AGREGADOS COMBINÁVEIS DE TRANSAÇÕES ---
+# Tudo o que os PASSOS 1, 3 e 4 precisam das transações cabe em quatro agregados
+# que podem ser somados entre si (mês a mês, ou bloco a bloco, vários de uma
+# vez com reduzir_agregados):
+#   'pagamentos'   -> índice ID_PGTO, colunas VL_PAGAMENTOS e QT_PAGAMENTOS
+#   'recebimentos' -> índice ID_RCBE, colunas VL_RECEBIMENTOS e QT_RECEBIMENTOS
+#   'pares'        -> Series com índice (ID_PGTO, ID_RCBE) e a soma de VL do par
+#   'mensais'      -> DataFrame (ID_RCBE, MES_ANO, VL) com a soma mensal recebida
+#   'cubo'         -> índice (ID_PGTO, ID_RCBE, MES_ANO), colunas VL e QT (soma e
+#                     contagem de cada par por mês), base do cubo do dashboard (cubo.py)
+# O 'cubo' tem quase tantas chaves quanto a base tem transações; por isso o modo
+# em blocos não o acumula (agregar_transacoes com com_cubo=False) e o grava mês
+# a mês com cubo.CuboEmBlocos.
+# Os IDs são os códigos inteiros do DicionarioIds (identificadores.py).
+
+
+def agregar_cubo(df_transacoes):
+    """Soma e contagem de VL de cada (ID_PGTO, ID_RCBE, MES_ANO), sem as chaves de IDs ausentes."""
+    cubo = df_transacoes.groupby(NIVEIS_CUBO)['VL'].agg(['sum', 'count']).rename(columns={'sum': 'VL', 'count': 'QT'})
+    return cubo[(cubo.index.get_level_values('ID_PGTO') >= 0) & (cubo.index.get_level_values('ID_RCBE') >= 0)]
+
+
+def agregar_transacoes(df_transacoes, com_cubo=True):
+    """Calcula os agregados de um conjunto de transações já limpo e com MES_ANO (com_cubo=False omite o 'cubo')."""
+    pagamentos = df_transacoes.groupby('ID_PGTO')['VL'].agg(['sum', 'count']).rename(columns={'sum': 'VL_PAGAMENTOS', 'count': 'QT_PAGAMENTOS'})
+    recebimentos = df_transacoes.groupby('ID_RCBE')['VL'].agg(['sum', 'count']).rename(columns={'sum': 'VL_RECEBIMENTOS', 'count': 'QT_RECEBIMENTOS'})
+    pares = df_transacoes.groupby(['ID_PGTO', 'ID_RCBE'])['VL'].sum()
+    mensais = df_transacoes.groupby(['ID_RCBE', 'MES_ANO'])['VL'].sum().reset_index()
+    agregados = {'pagamentos': pagamentos, 'recebimentos': recebimentos, 'pares': pares, 'mensais': mensais}
+    if (df_transacoes['ID_PGTO'] < 0).any() or (df_transacoes['ID_RCBE'] < 0).any():
+        agregados = descartar_ids_ausentes(agregados)
+    if com_cubo:
+        agregados['cubo'] = agregar_cubo(df_transacoes)
+    return agregados
+
+
+def descartar_ids_ausentes(agregados):
+    """Remove as chaves com código negativo (ID ausente), que o groupby sobre o texto descartava como NaN."""
+    pagamentos, recebimentos, pares, mensais = (agregados[chave] for chave in ('pagamentos', 'recebimentos', 'pares', 'mensais'))
+    resultado = {
+        'pagamentos': pagamentos[pagamentos.index >= 0],
+        'recebimentos': recebimentos[recebimentos.index >= 0],
+        'pares': pares[(pares.index.get_level_values('ID_PGTO') >= 0) & (pares.index.get_level_values('ID_RCBE') >= 0)],
+        'mensais': mensais[mensais['ID_RCBE'] >= 0].reset_index(drop=True),
+    }
+    if 'cubo' in agregados:
+        cubo = agregados['cubo']
+        resultado['cubo'] = cubo[(cubo.index.get_level_values('ID_PGTO') >= 0) & (cubo.index.get_level_values('ID_RCBE') >= 0)]
+    return resultado
+
+
+def reduzir_agregados(lista):
+    """Soma vários conjuntos de agregados de uma só vez (concat + groupby), como se as transações tivessem sido agregadas juntas.
+
+    Só as chaves presentes em todos os conjuntos entram no resultado; as contagens continuam int64.
+    """
+    if len(lista) == 1:
+        return lista[0]
+    reduzido = {}
+    for chave, niveis in (('pagamentos', 'ID_PGTO'), ('recebimentos', 'ID_RCBE'), ('pares', ['ID_PGTO', 'ID_RCBE']), ('cubo', NIVEIS_CUBO)):
+        if all(chave in agregados for agregados in lista):
+            reduzido[chave] = pd.concat([agregados[chave] for agregados in lista]).groupby(level=niveis).sum()
+    if all('mensais' in agregados for agregados in lista):
+        reduzido['mensais'] = pd.concat([agregados['mensais'] for agregados in lista]).groupby(['ID_RCBE', 'MES_ANO'])['VL'].sum().reset_index()
+    return reduzido
+
+
+def combinar_agregados(a, b):
+    """Soma dois conjuntos de agregados, como se as transações tivessem sido agregadas juntas."""
+    return reduzir_agregados([a, b])
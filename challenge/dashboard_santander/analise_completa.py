@@ -1,139 +1,383 @@
 import pandas as pd
 import numpy as np
-from sklearn.cluster import KMeans
-from sklearn.preprocessing import StandardScaler
+import argparse
+import os
+import sys
 import warnings
 import logging
 import time
-from tqdm import tqdm
-import networkx as nx
-
-# --- CONFIGURAÇÃO DO LOG ---
-log_format = '%(asctime)s - %(levelname)s - %(message)s'
-logging.basicConfig(level=logging.INFO, 
-                    format=log_format,
-                    handlers=[
-                        logging.FileHandler("analise.log", mode='w'),
-                        logging.StreamHandler()
-                    ])
-
-# --- INÍCIO DO SCRIPT ---
-warnings.filterwarnings('ignore')
-logging.info("======================================================")
-logging.info("=== INICIANDO SCRIPT DE ANÁLISE (MODO HISTÓRICO) ===")
-logging.info("======================================================")
-start_time_total = time.time()
-
-# --- PASSO 1: CARREGAR, LIMPAR E PREPARAR OS DADOS ---
-logging.info("[PASSO 1/5] Iniciando: Carregamento, Limpeza e Preparação dos Dados.")
-start_time_step = time.time()
-try:
-    df_id = pd.read_csv('Base 1 - ID.csv', sep=';')
-    df_transacoes = pd.read_csv('Base 2 - Transações.csv', sep=';')
-    logging.info(f"Arquivos carregados. Base ID: {df_id.shape[0]} linhas. Base Transações: {df_transacoes.shape[0]} linhas.")
-except FileNotFoundError as e:
-    logging.error(f"ERRO CRÍTICO: Arquivo não encontrado. Detalhe: {e}")
-    exit()
-
-# --- INÍCIO DA CORREÇÃO: Limpeza e Padronização dos IDs ---
-logging.info("Realizando limpeza dos IDs (removendo espaços e padronizando para maiúsculas)...")
-df_id['ID'] = df_id['ID'].astype(str).str.strip().str.upper()
-df_transacoes['ID_PGTO'] = df_transacoes['ID_PGTO'].astype(str).str.strip().str.upper()
-df_transacoes['ID_RCBE'] = df_transacoes['ID_RCBE'].astype(str).str.strip().str.upper()
-logging.info(f"Limpeza concluída. Número de IDs únicos agora é: {df_id['ID'].nunique()}")
-# --- FIM DA CORREÇÃO ---
-
-
-# Feature Engineering
-logging.info("Iniciando Feature Engineering...")
-df_id['DT_REFE'] = pd.to_datetime(df_id['DT_REFE'], errors='coerce')
-df_id['DT_ABRT'] = pd.to_datetime(df_id['DT_ABRT'], errors='coerce')
-df_id['IDADE_EMPRESA'] = (df_id['DT_REFE'] - df_id['DT_ABRT']).dt.days / 365.25
-logging.info("Coluna 'IDADE_EMPRESA' criada para cada snapshot de tempo.")
-logging.info("Agregando dados de transações...")
-pagamentos = df_transacoes.groupby('ID_PGTO')['VL'].agg(['sum', 'count']).rename(columns={'sum': 'VL_PAGAMENTOS', 'count': 'QT_PAGAMENTOS'})
-recebimentos = df_transacoes.groupby('ID_RCBE')['VL'].agg(['sum', 'count']).rename(columns={'sum': 'VL_RECEBIMENTOS', 'count': 'QT_RECEBIMENTOS'})
-df_final = df_id.merge(pagamentos, left_on='ID', right_index=True, how='left')
-df_final = df_final.merge(recebimentos, left_on='ID', right_index=True, how='left')
-df_final.fillna(0, inplace=True)
-logging.info(f"PASSO 1 concluído em {time.time() - start_time_step:.2f} segundos.")
-
-
-# --- PASSO 2: CLASSIFICAÇÃO DE MOMENTO DE VIDA (K-MEANS) ---
-logging.info("\n[PASSO 2/5] Iniciando: Classificação de Momento de Vida para cada registro.")
-start_time_step = time.time()
-features = ['VL_FATU', 'VL_SLDO', 'IDADE_EMPRESA', 'VL_PAGAMENTOS', 'VL_RECEBIMENTOS']
-X = df_final[features]
-scaler = StandardScaler()
-X_scaled = scaler.fit_transform(X)
+from agregados import agregar_transacoes
+from artefatos import (ARTEFATO_EMPRESAS, ARTEFATO_TRANSACOES, CATEGORICAS_EMPRESAS, CATEGORICAS_TRANSACOES,
+                       descartar_pendentes, diretorio_pendente, nome_parte, publicar_partes, salvar_artefato, salvar_parte)
+from cubo import ARTEFATO_CUBO, ARTEFATO_IDS_CUBO, CuboEmBlocos, montar_cubo, salvar_ids_cubo
+from metricas import ARQUIVO_METRICAS, configurar_metricas, finalizar_etapa, iniciar_etapa
+from insights import ARTEFATO_OPORTUNIDADES, gerar_oportunidades
+from identificadores import DicionarioIds
+from ingestao import agregar_em_blocos, preparar_base_id, preparar_transacoes
+from momento_vida import ARQUIVO_MODELO, carregar_modelo, salvar_modelo
+from estado import DIRETORIO_ESTADO, atualizar_estado, carregar_estado, criar_estado, salvar_estado
+from etapas import montar_etapas
+from pipeline import DIRETORIO_CACHE, executar_dag
+
+ARQUIVO_BASE_ID = 'Base 1 - ID.csv'
+ARQUIVO_TRANSACOES = 'Base 2 - Transações.csv'
 K_CLUSTERS = 4
-kmeans = KMeans(n_clusters=K_CLUSTERS, random_state=42, n_init=10)
-df_final['CLUSTER'] = kmeans.fit_predict(X_scaled)
-cluster_means = df_final.groupby('CLUSTER')[features].mean().sort_values('VL_FATU')
-mapeamento = {cluster_means.index[0]: 'Pequeno Porte', cluster_means.index[1]: 'Em Crescimento', cluster_means.index[2]: 'Consolidada', cluster_means.index[3]: 'Grande Porte'}
-df_final['MOMENTO_VIDA'] = df_final['CLUSTER'].map(mapeamento)
-logging.info(f"PASSO 2 concluído em {time.time() - start_time_step:.2f} segundos.")
-
-
-# --- PASSO 3: ANÁLISE DE REDE (OTIMIZADO) ---
-logging.info("\n[PASSO 3/5] Iniciando: Análise da Rede de Transações.")
-start_time_step = time.time()
-G = nx.from_pandas_edgelist(df_transacoes, 'ID_PGTO', 'ID_RCBE', ['VL'], create_using=nx.DiGraph())
-centralidade = nx.degree_centrality(G)
-df_final['CENTRALIDADE'] = df_final['ID'].map(centralidade).fillna(0)
-logging.info("Calculando nível de dependência máxima...")
-total_pagamentos = df_transacoes.groupby('ID_PGTO')['VL'].sum()
-total_recebimentos = df_transacoes.groupby('ID_RCBE')['VL'].sum()
-max_pgto_parceiro = df_transacoes.groupby(['ID_PGTO', 'ID_RCBE'])['VL'].sum().groupby('ID_PGTO').max()
-max_rcbe_parceiro = df_transacoes.groupby(['ID_RCBE', 'ID_PGTO'])['VL'].sum().groupby('ID_RCBE').max()
-dependencia_pgto = (max_pgto_parceiro / total_pagamentos).rename("dep_pgto")
-dependencia_rcbe = (max_rcbe_parceiro / total_recebimentos).rename("dep_rcbe")
-df_dependencia = pd.concat([dependencia_pgto, dependencia_rcbe], axis=1).fillna(0)
-dependencia_maxima = df_dependencia.max(axis=1)
-df_final['NIVEL_DEPENDENCIA'] = df_final['ID'].map(dependencia_maxima).fillna(0)
-logging.info(f"PASSO 3 concluído em {time.time() - start_time_step:.2f} segundos.")
-
-
-# --- PASSO 4: MODELO DE PROJEÇÃO MELHORADO ---
-logging.info("\n[PASSO 4/5] Iniciando: Modelo de Projeção de Recebimentos.")
-start_time_step = time.time()
-df_transacoes['DT_REFE'] = pd.to_datetime(df_transacoes['DT_REFE'], errors='coerce')
-df_transacoes['MES_ANO'] = df_transacoes['DT_REFE'].dt.to_period('M')
-recebimentos_mensais = df_transacoes.groupby(['ID_RCBE', 'MES_ANO'])['VL'].sum().reset_index()
-projecoes = {}
-empresas_unicas = recebimentos_mensais['ID_RCBE'].unique()
-logging.info(f"Calculando projeções para {len(empresas_unicas)} empresas com histórico de recebimentos...")
-for empresa_id in tqdm(empresas_unicas, desc="Calculando Projeções"):
-    dados_empresa = recebimentos_mensais[recebimentos_mensais['ID_RCBE'] == empresa_id].sort_values('MES_ANO')
-    n_months = len(dados_empresa)
-    projecao = 0
-    if n_months == 1:
-        projecao = dados_empresa['VL'].iloc[-1]
-    elif n_months == 2:
-        mes1_val, mes2_val = dados_empresa['VL'].iloc[0], dados_empresa['VL'].iloc[1]
-        if mes1_val > 0:
-            taxa_crescimento = mes2_val / mes1_val
-            projecao = mes2_val * taxa_crescimento
+COLUNAS_ID_TRANSACOES = ['ID_PGTO', 'ID_RCBE']
+REGRA_PROJECAO = 'ponderada'
+PARAMETROS_PROJECAO = {'peso_ultimo': 0.7, 'peso_penultimo': 0.3}
+DESCRICAO_ETAPAS = {
+    'juncao': "PASSO 1 (junção dos agregados)",
+    'momento_vida': "PASSO 2 (momento de vida)",
+    'rede': "PASSO 3 (análise de rede)",
+    'projecao': "PASSO 4 (projeção de recebimentos)",
+    'montagem': "Passo de montagem da tabela final",
+}
+
+
+def configurar_log():
+    # --- CONFIGURAÇÃO DO LOG ---
+    log_format = '%(asctime)s - %(levelname)s - %(message)s'
+    logging.basicConfig(level=logging.INFO, 
+                        format=log_format,
+                        handlers=[
+                            logging.FileHandler("analise.log", mode='w', encoding='utf-8'),
+                            logging.StreamHandler()
+                        ])
+
+
+def carregar_bases(arquivo_id, arquivo_transacoes, dicionario_ids):
+    # --- PASSO 1: CARREGAR, LIMPAR E PREPARAR OS DADOS ---
+    logging.info("[PASSO 1/5] Iniciando: Carregamento, Limpeza e Preparação dos Dados.")
+    medicao = iniciar_etapa('passo1.carregamento')
+    try:
+        df_id = pd.read_csv(arquivo_id, sep=';') if arquivo_id else None
+        df_transacoes = pd.read_csv(arquivo_transacoes, sep=';') if arquivo_transacoes else None
+        logging.info(f"Arquivos carregados. Base ID: {0 if df_id is None else df_id.shape[0]} linhas. Base Transações: {0 if df_transacoes is None else df_transacoes.shape[0]} linhas.")
+    except FileNotFoundError as e:
+        logging.error(f"ERRO CRÍTICO: Arquivo não encontrado. Detalhe: {e}")
+        exit()
+
+    logging.info("Realizando limpeza dos IDs (removendo espaços e padronizando para maiúsculas) e convertendo-os em códigos inteiros...")
+    if df_id is not None:
+        df_id = preparar_base_id(df_id, dicionario_ids)
+        logging.info(f"Limpeza concluída. Número de IDs únicos agora é: {df_id['ID'].nunique()}")
+    if df_transacoes is not None:
+        df_transacoes = preparar_transacoes(df_transacoes, dicionario_ids)
+    logging.info(f"Dicionário de IDs com {len(dicionario_ids)} IDs distintos nas duas bases.")
+    linhas = sum(len(df) for df in (df_id, df_transacoes) if df is not None)
+    medicao['linhas_entrada'] = linhas
+    finalizar_etapa(medicao, linhas_saida=linhas)
+    return df_id, df_transacoes
+
+
+def descartar_partes_em_blocos():
+    for artefato in (ARTEFATO_TRANSACOES, ARTEFATO_CUBO):
+        descartar_pendentes(artefato)
+
+
+def agregar_transacoes_em_blocos(arquivo_transacoes, tamanho_bloco, dicionario_ids):
+    """Modo streaming da Base 2: cada bloco é agregado e gravado como parte pendente, sem manter as linhas em memória.
+
+    O cubo não entra nos agregados: os meses encerrados são gravados como partes pendentes do cubo.
+    As partes só entram nos artefatos com publicar_partes_em_blocos, depois de validada a execução.
+    """
+    logging.info(f"Lendo '{arquivo_transacoes}' em blocos de {tamanho_bloco} linhas...")
+    medicao = iniciar_etapa('passo1.agregacao_blocos')
+    # Partes pendentes de uma execução interrompida não podem ser publicadas junto com as desta.
+    descartar_partes_em_blocos()
+    cubo_blocos = CuboEmBlocos()
+
+    def salvar_bloco(numero, bloco):
+        cubo_blocos.adicionar(bloco)
+        bloco = dicionario_ids.decodificar_colunas(bloco, COLUNAS_ID_TRANSACOES)
+        salvar_parte(bloco, diretorio_pendente(ARTEFATO_TRANSACOES), f"bloco-{numero:05d}", CATEGORICAS_TRANSACOES)
+
+    try:
+        agregados, total_linhas = agregar_em_blocos(arquivo_transacoes, tamanho_bloco, dicionario_ids, salvar_bloco)
+    except FileNotFoundError as e:
+        logging.error(f"ERRO CRÍTICO: Arquivo não encontrado. Detalhe: {e}")
+        exit()
+    cubo_blocos.finalizar()
+    logging.info(f"Base Transações: {total_linhas} linhas agregadas em blocos ({len(agregados['pares'])} pares distintos).")
+    logging.info(f"Cubo de transações gravado durante a leitura: {cubo_blocos.linhas} linhas em {cubo_blocos.partes} partes pendentes.")
+    medicao['linhas_entrada'] = total_linhas
+    finalizar_etapa(medicao, linhas_saida=len(agregados['pares']), tamanho_bloco=tamanho_bloco)
+    return agregados
+
+
+def publicar_partes_em_blocos(meses, dicionario_ids, anexar=False):
+    """Move as partes pendentes das transações e do cubo para os artefatos: 'completo' ou, com anexar, as dos meses novos."""
+    parte = nome_parte(meses) if anexar else 'completo'
+    # Os IDs vão antes das partes do cubo, que só guardam os códigos.
+    salvar_ids_cubo(dicionario_ids)
+    for artefato, descricao in ((ARTEFATO_TRANSACOES, 'transações'), (ARTEFATO_CUBO, 'cubo de transações')):
+        if parte is None:
+            descartar_pendentes(artefato)
+            logging.info(f"Nenhum mês novo: {descricao} em '{artefato}' mantido sem alterações.")
         else:
-            projecao = mes2_val
-    elif n_months >= 3:
-        mes_ultimo_val, mes_penultimo_val = dados_empresa['VL'].iloc[-1], dados_empresa['VL'].iloc[-2]
-        projecao = (mes_ultimo_val * 0.7) + (mes_penultimo_val * 0.3)
-    projecoes[empresa_id] = max(0, projecao)
-df_final['PROJECAO_RECEBIMENTO'] = df_final['ID'].map(projecoes).fillna(0)
-logging.info(f"PASSO 4 concluído em {time.time() - start_time_step:.2f} segundos.")
-
-
-# --- PASSO 5: SALVAR RESULTADOS ---
-logging.info("\n[PASSO 5/5] Iniciando: Salvamento dos Arquivos Finais.")
-start_time_step = time.time()
-df_final.to_csv('empresas_analisadas.csv', index=False)
-logging.info("Arquivo 'empresas_analisadas.csv' salvo com sucesso.")
-df_transacoes.to_csv('transacoes_com_data.csv', index=False)
-logging.info(f"PASSO 5 concluído em {time.time() - start_time_step:.2f} segundos.")
-
-# --- FIM DO SCRIPT ---
-logging.info("\n=======================================================")
-logging.info(f"=== ANÁLISE CONCLUÍDA COM SUCESSO ===")
-logging.info(f"=== Tempo Total de Execução: {time.time() - start_time_total:.2f} segundos ===")
-logging.info("=======================================================")
\ No newline at end of file
+            partes = publicar_partes(artefato, parte, substituir=not anexar)
+            logging.info(f"{partes} partes de {descricao} gravadas em '{artefato}' (parte '{parte}').")
+
+
+def carregar_do_banco(url_banco, dicionario_ids, a_partir_de=None):
+    """PASSO 1 com as bases em um banco: a Base 1 é lida e as transações são agregadas pelo próprio banco."""
+    # Importado aqui para que o sqlalchemy só seja necessário quando houver banco.
+    from sqlalchemy.exc import SQLAlchemyError
+    from banco_dados import agregar_no_banco, criar_conexao, ler_base_id
+    logging.info("[PASSO 1/5] Iniciando: Leitura da Base 1 e agregação das transações no banco de dados.")
+    if a_partir_de is not None:
+        logging.info(f"Buscando apenas os meses posteriores a {a_partir_de}.")
+    medicao = iniciar_etapa('passo1.banco')
+    try:
+        engine = criar_conexao(url_banco)
+        df_id = ler_base_id(engine, a_partir_de=a_partir_de)
+        agregados = agregar_no_banco(engine, dicionario_ids, a_partir_de=a_partir_de)
+    except SQLAlchemyError as e:
+        logging.error(f"ERRO CRÍTICO: Falha ao conectar ou buscar dados do banco. Detalhe: {e}")
+        exit()
+    df_id = preparar_base_id(df_id, dicionario_ids)
+    logging.info(f"Base ID: {len(df_id)} linhas. Agregados do banco: {len(agregados['pagamentos'])} pagadores, {len(agregados['recebimentos'])} recebedores e {len(agregados['pares'])} pares.")
+    linhas = len(df_id) + sum(len(agregados[chave]) for chave in ('pagamentos', 'recebimentos', 'pares', 'mensais'))
+    medicao['linhas_entrada'] = linhas
+    finalizar_etapa(medicao, linhas_saida=linhas)
+    return df_id, agregados
+
+
+def agregar_transacoes_em_memoria(df_transacoes):
+    medicao = iniciar_etapa('passo1.agregacao', linhas_entrada=len(df_transacoes))
+    agregados = agregar_transacoes(df_transacoes)
+    finalizar_etapa(medicao, linhas_saida=len(agregados['pares']))
+    return agregados
+
+
+def carregar_modelo_momento():
+    """PASSO 2 no modo somente previsão: o modelo salvo entra como parâmetro da etapa (e na chave do cache)."""
+    try:
+        modelo = carregar_modelo(ARQUIVO_MODELO)
+    except FileNotFoundError:
+        logging.error(f"ERRO CRÍTICO: Modelo '{ARQUIVO_MODELO}' não encontrado. Execute o script com --momento-vida treinar primeiro.")
+        exit()
+    logging.info(f"Modo somente previsão: usando o modelo salvo em '{ARQUIVO_MODELO}'.")
+    return modelo
+
+
+def registrar_etapa(etapa, registro, reaproveitada):
+    descricao = DESCRICAO_ETAPAS.get(etapa.nome, etapa.nome)
+    if reaproveitada:
+        logging.info(f"{descricao}: resultado reaproveitado do cache (chave {registro['chave']}).")
+    else:
+        logging.info(f"{descricao} concluído em {registro['tempo_parede_s']:.2f} segundos.")
+
+
+def analisar_empresas(df_id, pagamentos, recebimentos, pares, resumo_projecao, modo_momento='treinar', processos=None, usar_cache=True):
+    """Executa os PASSOS 1 (junção), 2, 3 e 4 como um DAG: etapas independentes em paralelo, etapas já calculadas lidas do cache."""
+    modelo = carregar_modelo_momento() if modo_momento == 'prever' else None
+    etapas = montar_etapas(modo_momento, K_CLUSTERS, REGRA_PROJECAO, PARAMETROS_PROJECAO, modelo)
+    entradas = {'base_id': df_id, 'pagamentos': pagamentos, 'recebimentos': recebimentos, 'pares': pares, 'resumo_projecao': resumo_projecao}
+    logging.info("\n[PASSOS 1 a 4] Iniciando: junção, momento de vida (K-Means), rede de transações e projeção de recebimentos.")
+    logging.info(f"Etapas em até {processos or os.cpu_count()} processos; cache {'em ' + repr(DIRETORIO_CACHE) if usar_cache else 'desativado'}. Regra de projeção '{REGRA_PROJECAO}' com {PARAMETROS_PROJECAO}.")
+    resultados = executar_dag(etapas, entradas, alvos=['montagem', 'momento_vida'], processos=processos,
+                              usar_cache=usar_cache, ao_concluir=registrar_etapa)
+    df_final = resultados['montagem']
+    logging.info(f"Tabela final com {len(df_final)} registros; {(df_final['CENTRALIDADE'] > 0).sum()} com participação na rede de transações.")
+    return df_final, resultados['momento_vida']['modelo']
+
+
+def analisar_estado(estado, modo_momento='treinar', processos=None, usar_cache=True):
+    return analisar_empresas(estado['base_id'], estado['pagamentos'], estado['recebimentos'], estado['pares'], estado['resumo_projecao'], modo_momento, processos, usar_cache)
+
+
+def salvar_modelo_momento(modelo, modo_momento):
+    if modo_momento != 'prever':
+        salvar_modelo(modelo, ARQUIVO_MODELO)
+        logging.info(f"Modelo de momento de vida salvo em '{ARQUIVO_MODELO}'.")
+
+
+def salvar_parte_resultados(df, artefato, categoricas, anexar=False):
+    """Parte 'completo' (substituindo as anteriores) ou, com anexar, uma parte nomeada pelos meses de MES_ANO; None se não há mês novo."""
+    parte = nome_parte(df['MES_ANO']) if anexar else 'completo'
+    if parte is not None:
+        salvar_parte(df, artefato, parte, categoricas, substituir=not anexar)
+    return parte
+
+
+def salvar_resultados(df_final, df_transacoes, dicionario_ids, cubo=None, anexar_transacoes=False, url_banco=None):
+    # --- PASSO 5: SALVAR RESULTADOS ---
+    logging.info("\n[PASSO 5/5] Iniciando: Salvamento dos Arquivos Finais.")
+    medicao = iniciar_etapa('passo5.salvamento', linhas_entrada=len(df_final) + (0 if df_transacoes is None else len(df_transacoes)))
+    # Os códigos voltam a ser os IDs em texto apenas aqui, na saída.
+    df_final = dicionario_ids.decodificar_colunas(df_final, ['ID'])
+    salvar_artefato(df_final, ARTEFATO_EMPRESAS, CATEGORICAS_EMPRESAS)
+    logging.info(f"Arquivo '{ARTEFATO_EMPRESAS}' salvo com sucesso.")
+    oportunidades = gerar_oportunidades(df_final)
+    salvar_artefato(oportunidades, ARTEFATO_OPORTUNIDADES, CATEGORICAS_EMPRESAS)
+    logging.info(f"Arquivo '{ARTEFATO_OPORTUNIDADES}' salvo com {int((oportunidades['N_OPORTUNIDADES'] > 0).sum())} empresas com oportunidades comerciais.")
+    if df_transacoes is not None:
+        df_transacoes = dicionario_ids.decodificar_colunas(df_transacoes, COLUNAS_ID_TRANSACOES)
+        if salvar_parte_resultados(df_transacoes, ARTEFATO_TRANSACOES, CATEGORICAS_TRANSACOES, anexar_transacoes) is None:
+            logging.info(f"Nenhum mês novo: transações em '{ARTEFATO_TRANSACOES}' mantidas sem alterações.")
+    if cubo is not None:
+        df_cubo = montar_cubo(cubo)
+        salvar_ids_cubo(dicionario_ids)
+        if salvar_parte_resultados(df_cubo, ARTEFATO_CUBO, (), anexar_transacoes) is None:
+            logging.info(f"Nenhum mês novo: cubo de transações em '{ARTEFATO_CUBO}' mantido sem alterações.")
+        else:
+            logging.info(f"Cubo de transações salvo em '{ARTEFATO_CUBO}' com {len(df_cubo)} linhas (pagador, recebedor e mês); IDs em '{ARTEFATO_IDS_CUBO}'.")
+    if url_banco:
+        from banco_dados import TABELA_OPORTUNIDADES, TABELA_RESULTADOS, criar_conexao, gravar_tabela
+        engine = criar_conexao(url_banco)
+        gravar_tabela(df_final, engine, TABELA_RESULTADOS)
+        gravar_tabela(oportunidades, engine, TABELA_OPORTUNIDADES)
+        logging.info(f"Tabelas '{TABELA_RESULTADOS}' e '{TABELA_OPORTUNIDADES}' gravadas no banco.")
+    registro = finalizar_etapa(medicao, linhas_saida=len(df_final) + len(oportunidades))
+    logging.info(f"PASSO 5 concluído em {registro['tempo_parede_s']:.2f} segundos.")
+
+
+def salvar_estado_medido(estado, diretorio_estado):
+    medicao = iniciar_etapa('estado.salvar', linhas_entrada=len(estado['base_id']) + len(estado['pares']))
+    salvar_estado(estado, diretorio_estado)
+    finalizar_etapa(medicao)
+
+
+def executar_completo(arquivo_id, arquivo_transacoes, diretorio_estado, tamanho_bloco=None, modo_momento='treinar', processos=None, usar_cache=True, url_banco=None):
+    start_time_step = time.time()
+    dicionario_ids = DicionarioIds()
+    if url_banco:
+        df_id, agregados = carregar_do_banco(url_banco, dicionario_ids)
+        df_transacoes = None
+    elif tamanho_bloco:
+        df_id, df_transacoes = carregar_bases(arquivo_id, None, dicionario_ids)
+        agregados = agregar_transacoes_em_blocos(arquivo_transacoes, tamanho_bloco, dicionario_ids)
+    else:
+        df_id, df_transacoes = carregar_bases(arquivo_id, arquivo_transacoes, dicionario_ids)
+        logging.info("Iniciando Feature Engineering...")
+        agregados = agregar_transacoes_em_memoria(df_transacoes)
+    logging.info(f"Base preparada em {time.time() - start_time_step:.2f} segundos.")
+    estado = criar_estado(df_id, agregados, dicionario_ids)
+    df_final, modelo_momento = analisar_estado(estado, modo_momento, processos, usar_cache)
+    if tamanho_bloco and not url_banco:
+        publicar_partes_em_blocos(agregados['mensais']['MES_ANO'], dicionario_ids)
+    salvar_resultados(df_final, df_transacoes, dicionario_ids, agregados.get('cubo'), url_banco=url_banco)
+    salvar_modelo_momento(modelo_momento, modo_momento)
+    salvar_estado_medido(estado, diretorio_estado)
+    logging.info(f"Estado incremental salvo em '{diretorio_estado}' (último mês: {estado['ultimo_mes']}).")
+
+
+def executar_incremental(arquivo_id, arquivo_transacoes, diretorio_estado, tamanho_bloco=None, modo_momento='prever', processos=None, usar_cache=True, url_banco=None):
+    start_time_step = time.time()
+    try:
+        estado = carregar_estado(diretorio_estado)
+    except FileNotFoundError:
+        logging.error(f"ERRO CRÍTICO: Estado incremental não encontrado em '{diretorio_estado}'. Execute o script sem --incremental primeiro.")
+        exit()
+    dicionario_ids = estado['ids']
+    if url_banco:
+        df_id_novo, agregados_novos = carregar_do_banco(url_banco, dicionario_ids, a_partir_de=estado['ultimo_mes'])
+        df_transacoes_novas = None
+    elif tamanho_bloco:
+        df_id_novo, df_transacoes_novas = carregar_bases(arquivo_id, None, dicionario_ids)
+        agregados_novos = agregar_transacoes_em_blocos(arquivo_transacoes, tamanho_bloco, dicionario_ids)
+    else:
+        df_id_novo, df_transacoes_novas = carregar_bases(arquivo_id, arquivo_transacoes, dicionario_ids)
+        agregados_novos = agregar_transacoes_em_memoria(df_transacoes_novas)
+    medicao = iniciar_etapa('estado.atualizar', linhas_entrada=len(agregados_novos['pares']))
+    try:
+        estado = atualizar_estado(estado, df_id_novo, agregados_novos)
+    except ValueError as e:
+        # Os blocos já gravados não entram nos artefatos: a execução foi rejeitada.
+        descartar_partes_em_blocos()
+        logging.error(f"ERRO CRÍTICO: {e}")
+        exit()
+    finalizar_etapa(medicao, linhas_saida=len(estado['pares']))
+    logging.info(f"Estado atualizado até {estado['ultimo_mes']} em {time.time() - start_time_step:.2f} segundos.")
+    df_final, modelo_momento = analisar_estado(estado, modo_momento, processos, usar_cache)
+    try:
+        if tamanho_bloco and not url_banco:
+            publicar_partes_em_blocos(agregados_novos['mensais']['MES_ANO'], dicionario_ids, anexar=True)
+        salvar_resultados(df_final, df_transacoes_novas, dicionario_ids, agregados_novos.get('cubo'), anexar_transacoes=True, url_banco=url_banco)
+    except FileExistsError as e:
+        logging.error(f"ERRO CRÍTICO: {e} Os meses dela já foram gravados; confira o estado em '{diretorio_estado}'.")
+        exit()
+    salvar_modelo_momento(modelo_momento, modo_momento)
+    salvar_estado_medido(estado, diretorio_estado)
+
+
+def verificar_incremental(arquivo_id, arquivo_transacoes, modo_momento='treinar', processos=None, usar_cache=True):
+    """Separa o último mês das bases completas, aplica-o de forma incremental e compara com o recálculo completo."""
+    dicionario_ids = DicionarioIds()
+    df_id, df_transacoes = carregar_bases(arquivo_id, arquivo_transacoes, dicionario_ids)
+    ultimo_mes = df_transacoes['MES_ANO'].max()
+    novas = df_transacoes['MES_ANO'] == ultimo_mes
+    novos_ids = df_id['DT_REFE'].dt.to_period('M') == ultimo_mes
+    logging.info(f"Verificação: estado até o mês anterior a {ultimo_mes} + {novas.sum()} transações e {novos_ids.sum()} snapshots do último mês.")
+
+    completo, _ = analisar_estado(criar_estado(df_id, agregar_transacoes(df_transacoes), dicionario_ids), modo_momento, processos, usar_cache)
+    estado = criar_estado(df_id[~novos_ids].reset_index(drop=True), agregar_transacoes(df_transacoes[~novas]), dicionario_ids)
+    estado = atualizar_estado(estado, df_id[novos_ids], agregar_transacoes(df_transacoes[novas]))
+    incremental, _ = analisar_estado(estado, modo_momento, processos, usar_cache)
+
+    chaves = ['ID', 'DT_REFE']
+    completo = completo.sort_values(chaves, kind='mergesort').reset_index(drop=True)
+    incremental = incremental.sort_values(chaves, kind='mergesort').reset_index(drop=True)
+    divergentes = []
+    for coluna in completo.columns:
+        if pd.api.types.is_numeric_dtype(completo[coluna]):
+            iguais = np.allclose(completo[coluna], incremental[coluna], rtol=1e-9, atol=1e-6, equal_nan=True)
+        else:
+            iguais = completo[coluna].equals(incremental[coluna])
+        if not iguais:
+            divergentes.append(coluna)
+    if divergentes or len(completo) != len(incremental):
+        logging.error(f"VERIFICAÇÃO FALHOU: colunas divergentes entre incremental e recálculo completo: {divergentes}")
+        return False
+    logging.info(f"VERIFICAÇÃO OK: {len(completo)} registros idênticos entre o modo incremental e o recálculo completo.")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Análise de empresas PJ: momento de vida, rede de transações e projeções.")
+    parser.add_argument('--incremental', action='store_true', help="Processa apenas o mês novo a partir do estado salvo pela última execução.")
+    parser.add_argument('--verificar', action='store_true', help="Confere se o modo incremental reproduz o recálculo completo sobre as bases informadas.")
+    parser.add_argument('--base-id', default=None, help=f"CSV da Base 1 (padrão: '{ARQUIVO_BASE_ID}'; no modo incremental, apenas os snapshots novos).")
+    parser.add_argument('--base-transacoes', default=ARQUIVO_TRANSACOES, help="CSV da Base 2 (no modo incremental, apenas as transações do mês novo).")
+    parser.add_argument('--estado', default=DIRETORIO_ESTADO, help="Diretório do estado incremental.")
+    parser.add_argument('--momento-vida', choices=['treinar', 'prever'], default=None, help=f"PASSO 2: treino completo ou apenas previsão com o modelo salvo em '{ARQUIVO_MODELO}' (padrão: prever no modo incremental, treinar nos demais).")
+    parser.add_argument('--metricas', default=ARQUIVO_METRICAS, help="Arquivo JSONL onde são gravadas as métricas de cada etapa (tempo, CPU, memória, linhas).")
+    parser.add_argument('--perfilar', default=None, metavar='ETAPA', help="Grava um perfil cProfile (perfil_<ETAPA>.prof) da etapa indicada, por exemplo passo3.rede.")
+    parser.add_argument('--banco', default=None, metavar='URL', help="Lê as bases de um banco (URL do SQLAlchemy), agregando as transações no próprio banco, e grava os resultados nele; substitui --base-id, --base-transacoes e --blocos.")
+    parser.add_argument('--processos', type=int, default=None, help="Número de processos para as etapas independentes dos PASSOS 2 a 4 (padrão: todos os núcleos; 1 = sequencial).")
+    parser.add_argument('--sem-cache', action='store_true', help=f"Recalcula todas as etapas, sem ler nem gravar o cache em '{DIRETORIO_CACHE}'.")
+    parser.add_argument('--blocos', type=int, default=None, metavar='LINHAS', help="Lê a Base 2 em blocos com este número de linhas, sem carregá-la inteira em memória.")
+    args = parser.parse_args()
+    arquivo_id = args.base_id if args.base_id or args.incremental else ARQUIVO_BASE_ID
+    # O mês novo é classificado com o modelo da última execução completa: retreinar o K-Means custaria o histórico inteiro.
+    modo_momento = args.momento_vida or ('prever' if args.incremental and not args.verificar else 'treinar')
+
+    configurar_log()
+    configurar_metricas(args.metricas, origem='analise', perfilar=args.perfilar)
+
+    # --- INÍCIO DO SCRIPT ---
+    warnings.filterwarnings('ignore')
+    modo = "VERIFICAÇÃO" if args.verificar else ("INCREMENTAL" if args.incremental else "HISTÓRICO")
+    logging.info("======================================================")
+    logging.info(f"=== INICIANDO SCRIPT DE ANÁLISE (MODO {modo}) ===")
+    logging.info("======================================================")
+    start_time_total = time.time()
+
+    if args.verificar:
+        if not verificar_incremental(arquivo_id, args.base_transacoes, modo_momento, args.processos, not args.sem_cache):
+            sys.exit(1)
+    elif args.incremental:
+        executar_incremental(arquivo_id, args.base_transacoes, args.estado, args.blocos, modo_momento, args.processos, not args.sem_cache, args.banco)
+    else:
+        executar_completo(arquivo_id, args.base_transacoes, args.estado, args.blocos, modo_momento, args.processos, not args.sem_cache, args.banco)
+
+    # --- FIM DO SCRIPT ---
+    logging.info("\n=======================================================")
+    logging.info(f"=== ANÁLISE CONCLUÍDA COM SUCESSO ===")
+    logging.info(f"=== Tempo Total de Execução: {time.time() - start_time_total:.2f} segundos ===")
+    logging.info("=======================================================")
+
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
@@ -0,0 +1,101 @@
+import glob
+import os
+import shutil
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.feather as feather
+from pyarrow import fs
+
+# --- ARTEFATOS COLUNARES ENTRE A ANÁLISE E O DASHBOARD ---
+# Os resultados são gravados em Arrow IPC (Feather v2) sem compressão: os tipos
+# (datas, MES_ANO como período, colunas categóricas) são preservados, a leitura
+# pode trazer só as colunas necessárias e o arquivo é lido via memory map, de
+# modo que vários processos do Streamlit compartilham as mesmas páginas em cache
+# do sistema operacional em vez de cada um manter sua própria cópia.
+#
+# Os artefatos particionados (diretórios de partes) recebem a parte 'completo'
+# na execução completa e, a cada execução incremental, uma parte nomeada pelos
+# meses que ela contém. Uma parte existente nunca é sobrescrita por outra
+# execução: isso só aconteceria se os mesmos meses fossem gravados duas vezes.
+# Partes gravadas antes de a execução ser validada (os blocos do modo streaming)
+# ficam em um diretório pendente ao lado do artefato e só são movidas para ele
+# por publicar_partes; se a execução for rejeitada, são descartadas.
+
+ARTEFATO_EMPRESAS = 'empresas_analisadas.arrow'
+ARTEFATO_TRANSACOES = 'transacoes_com_data'
+CATEGORICAS_EMPRESAS = ['MOMENTO_VIDA', 'DS_CNAE']
+CATEGORICAS_TRANSACOES = ['DS_TRAN']
+
+
+def _tabela_arrow(df, categoricas):
+    df = df.copy()
+    for coluna in categoricas:
+        if coluna in df.columns:
+            df[coluna] = df[coluna].astype('category')
+    return pa.Table.from_pandas(df, preserve_index=False)
+
+
+def salvar_artefato(df, caminho, categoricas=()):
+    feather.write_feather(_tabela_arrow(df, categoricas), caminho, compression='uncompressed')
+
+
+def nome_parte(meses):
+    """Nome da parte incremental pelos meses que ela contém ('mes-2025-05' ou 'meses-2025-05-a-2025-07'); None se não há mês."""
+    meses = pd.Index(meses).dropna().unique().sort_values()
+    if meses.empty:
+        return None
+    inicio, fim = str(meses[0]), str(meses[-1])
+    return f'mes-{inicio}' if inicio == fim else f'meses-{inicio}-a-{fim}'
+
+
+def salvar_parte(df, diretorio, parte, categoricas=(), substituir=False):
+    """Grava uma parte de um artefato particionado; com substituir=True apaga as partes anteriores.
+
+    Sem substituir, levanta FileExistsError se a parte já existe, em vez de sobrescrevê-la.
+    """
+    os.makedirs(diretorio, exist_ok=True)
+    if substituir:
+        for arquivo in glob.glob(os.path.join(diretorio, '*.arrow')):
+            os.remove(arquivo)
+    caminho = os.path.join(diretorio, f'{parte}.arrow')
+    if os.path.exists(caminho):
+        raise FileExistsError(f"A parte '{caminho}' já existe e não será sobrescrita.")
+    salvar_artefato(df, caminho, categoricas)
+
+
+def diretorio_pendente(diretorio):
+    return f'{diretorio}.pendente'
+
+
+def publicar_partes(diretorio, parte, substituir=False):
+    """Move as partes pendentes para o artefato, com o prefixo parte; nada é movido se algum nome já existir."""
+    pendentes = sorted(glob.glob(os.path.join(diretorio_pendente(diretorio), '*.arrow')))
+    destinos = [os.path.join(diretorio, f'{parte}-{os.path.basename(arquivo)}') for arquivo in pendentes]
+    os.makedirs(diretorio, exist_ok=True)
+    if substituir:
+        for arquivo in glob.glob(os.path.join(diretorio, '*.arrow')):
+            os.remove(arquivo)
+    existentes = [destino for destino in destinos if os.path.exists(destino)]
+    if existentes:
+        raise FileExistsError(f"A parte '{existentes[0]}' já existe e não será sobrescrita.")
+    for arquivo, destino in zip(pendentes, destinos):
+        os.replace(arquivo, destino)
+    descartar_pendentes(diretorio)
+    return len(destinos)
+
+
+def descartar_pendentes(diretorio):
+    shutil.rmtree(diretorio_pendente(diretorio), ignore_errors=True)
+
+
+def carregar_artefato(caminho, colunas=None):
+    """Lê um artefato (arquivo único ou diretório de partes) via memory map, apenas com as colunas pedidas."""
+    if not os.path.exists(caminho):
+        raise FileNotFoundError(caminho)
+    if os.path.isdir(caminho):
+        dataset = ds.dataset(caminho, format='ipc', filesystem=fs.LocalFileSystem(use_mmap=True))
+        tabela = dataset.to_table(columns=colunas)
+    else:
+        tabela = feather.read_table(caminho, columns=colunas, memory_map=True)
+    return tabela.to_pandas(split_blocks=True)
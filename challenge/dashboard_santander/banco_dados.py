@@ -0,0 +1,177 @@
+import argparse
+import numpy as np
+import pandas as pd
+from sqlalchemy import String, cast, column, create_engine, func, select, table
+from agregados import agregar_transacoes, descartar_ids_ausentes
+from identificadores import DicionarioIds
+from ingestao import preparar_transacoes
+
+# --- FONTE DE DADOS EM BANCO (AGREGAÇÕES EMPURRADAS PARA O SQL) ---
+# Quando as bases estão em um banco, as transações não precisam trafegar: os
+# agregados dos PASSOS 1, 3 e 4 (pagamentos e recebimentos por ID, soma por par,
+# recebimentos mensais e o cubo por par e mês do dashboard) são calculados pelo
+# próprio banco com GROUP BY, e só o resultado agregado é lido, em lotes, por um
+# cursor do lado do servidor (stream_results). Os IDs agregados, já limpos pelo
+# banco, são trocados pelos códigos do DicionarioIds, e os DataFrames devolvidos
+# têm exatamente a estrutura de agregados.agregar_transacoes, então o restante
+# do pipeline não muda.
+#
+# As consultas são montadas com o SQLAlchemy Core, sem SQL específico de um
+# banco: a limpeza dos IDs vira UPPER(TRIM(...)) e o mês vira os 7 primeiros
+# caracteres da data em texto ISO. Funciona em PostgreSQL e, para testes locais,
+# em SQLite ou DuckDB (com o pacote duckdb_engine). As conexões vêm de um pool
+# por URL, reaproveitado entre as consultas do mesmo processo.
+
+TABELA_EMPRESAS = 'tabela_empresas_historico'
+TABELA_TRANSACOES = 'tabela_transacoes'
+TABELA_RESULTADOS = 'empresas_analisadas'
+TABELA_OPORTUNIDADES = 'oportunidades'
+COLUNAS_BASE_ID = ['ID', 'VL_FATU', 'VL_SLDO', 'DT_ABRT', 'DS_CNAE', 'DT_REFE']
+TAMANHO_LOTE_SQL = 100_000
+TAMANHO_POOL = 5
+
+_conexoes = {}
+
+
+def criar_conexao(url, tamanho_pool=TAMANHO_POOL):
+    """Engine com pool de conexões, criado uma única vez por URL."""
+    if url not in _conexoes:
+        try:
+            _conexoes[url] = create_engine(url, pool_pre_ping=True, pool_size=tamanho_pool, max_overflow=tamanho_pool)
+        except TypeError:
+            # Pools que não aceitam tamanho (por exemplo SQLite em memória).
+            _conexoes[url] = create_engine(url, pool_pre_ping=True)
+    return _conexoes[url]
+
+
+def _id_limpo(coluna):
+    # Equivalente no banco de identificadores.limpar_ids (TRIM remove apenas espaços).
+    return func.upper(func.trim(coluna))
+
+
+def _mes(coluna):
+    return func.substr(cast(coluna, String(10)), 1, 7)
+
+
+def _consultar(engine, consulta, tamanho_lote=TAMANHO_LOTE_SQL):
+    """Executa a consulta com cursor do lado do servidor e monta o DataFrame lote a lote."""
+    with engine.connect().execution_options(stream_results=True, max_row_buffer=tamanho_lote) as conexao:
+        lotes = list(pd.read_sql(consulta, conexao, chunksize=tamanho_lote))
+    if not lotes:
+        return pd.DataFrame(columns=[coluna.name for coluna in consulta.selected_columns])
+    return pd.concat(lotes, ignore_index=True)
+
+
+def _como_periodo(meses):
+    return pd.to_datetime(meses.astype(str) + '-01', format='%Y-%m-%d', errors='coerce').dt.to_period('M')
+
+
+def ler_base_id(engine, tabela=TABELA_EMPRESAS, a_partir_de=None):
+    """Snapshots da Base 1 (sem limpeza); com a_partir_de, só os meses posteriores a ele."""
+    base = table(tabela, *[column(nome) for nome in COLUNAS_BASE_ID])
+    consulta = select(*base.c)
+    if a_partir_de is not None:
+        consulta = consulta.where(_mes(base.c.DT_REFE) > str(a_partir_de))
+    return _consultar(engine, consulta)
+
+
+def agregar_no_banco(engine, dicionario_ids, tabela=TABELA_TRANSACOES, a_partir_de=None, tamanho_lote=TAMANHO_LOTE_SQL):
+    """Mesmos agregados de agregar_transacoes, calculados pelo banco e codificados; com a_partir_de, só os meses posteriores."""
+    transacoes = table(tabela, column('ID_PGTO'), column('ID_RCBE'), column('VL'), column('DT_REFE'))
+    id_pgto, id_rcbe = _id_limpo(transacoes.c.ID_PGTO), _id_limpo(transacoes.c.ID_RCBE)
+    mes = _mes(transacoes.c.DT_REFE)
+    filtro = [mes > str(a_partir_de)] if a_partir_de is not None else []
+
+    def agrupar(chaves, *medidas):
+        consulta = select(*chaves, *medidas).where(*filtro).group_by(*[chave.element for chave in chaves])
+        return _consultar(engine, consulta, tamanho_lote)
+
+    pagamentos = agrupar([id_pgto.label('ID_PGTO')], func.sum(transacoes.c.VL).label('VL_PAGAMENTOS'), func.count(transacoes.c.VL).label('QT_PAGAMENTOS'))
+    recebimentos = agrupar([id_rcbe.label('ID_RCBE')], func.sum(transacoes.c.VL).label('VL_RECEBIMENTOS'), func.count(transacoes.c.VL).label('QT_RECEBIMENTOS'))
+    pares = agrupar([id_pgto.label('ID_PGTO'), id_rcbe.label('ID_RCBE')], func.sum(transacoes.c.VL).label('VL'))
+    mensais = agrupar([id_rcbe.label('ID_RCBE'), mes.label('MES_ANO')], func.sum(transacoes.c.VL).label('VL'))
+    cubo = agrupar([id_pgto.label('ID_PGTO'), id_rcbe.label('ID_RCBE'), mes.label('MES_ANO')], func.sum(transacoes.c.VL).label('VL'), func.count(transacoes.c.VL).label('QT'))
+
+    # Mesmos códigos, tipos, índices e ordenação que o groupby do pandas produziria.
+    for agregado, colunas in ((pagamentos, ['ID_PGTO']), (recebimentos, ['ID_RCBE']), (pares, ['ID_PGTO', 'ID_RCBE']), (mensais, ['ID_RCBE']), (cubo, ['ID_PGTO', 'ID_RCBE'])):
+        for coluna in colunas:
+            agregado[coluna] = dicionario_ids.codificar(agregado[coluna], limpos=True)
+    for agregado, prefixo in ((pagamentos, 'PAGAMENTOS'), (recebimentos, 'RECEBIMENTOS')):
+        agregado[f'VL_{prefixo}'] = agregado[f'VL_{prefixo}'].astype(float).fillna(0)
+        agregado[f'QT_{prefixo}'] = agregado[f'QT_{prefixo}'].astype(np.int64)
+    mensais['MES_ANO'] = _como_periodo(mensais['MES_ANO'])
+    mensais = mensais.dropna(subset=['MES_ANO']).sort_values(['ID_RCBE', 'MES_ANO'], kind='mergesort', ignore_index=True)
+    mensais['VL'] = mensais['VL'].astype(float).fillna(0)
+    cubo['MES_ANO'] = _como_periodo(cubo['MES_ANO'])
+    cubo = cubo.dropna(subset=['MES_ANO']).set_index(['ID_PGTO', 'ID_RCBE', 'MES_ANO']).sort_index()
+    cubo['VL'] = cubo['VL'].astype(float).fillna(0)
+    cubo['QT'] = cubo['QT'].astype(np.int64)
+    return descartar_ids_ausentes({
+        'pagamentos': pagamentos.set_index('ID_PGTO').sort_index(),
+        'recebimentos': recebimentos.set_index('ID_RCBE').sort_index(),
+        'pares': pares.set_index(['ID_PGTO', 'ID_RCBE'])['VL'].astype(float).fillna(0).sort_index(),
+        'mensais': mensais,
+        'cubo': cubo,
+    })
+
+
+def ler_tabela(engine, tabela, colunas):
+    """Lê apenas as colunas pedidas de uma tabela de resultados, em lotes."""
+    origem = table(tabela, *[column(nome) for nome in colunas])
+    return _consultar(engine, select(*origem.c))
+
+
+def gravar_tabela(df, engine, tabela, tamanho_lote=TAMANHO_LOTE_SQL):
+    """Substitui a tabela pelo conteúdo do DataFrame (tipos categóricos e períodos são gravados como texto)."""
+    df = df.copy()
+    for nome in df.columns:
+        if isinstance(df[nome].dtype, (pd.CategoricalDtype, pd.PeriodDtype)):
+            df[nome] = df[nome].astype(str)
+    df.to_sql(tabela, engine, if_exists='replace', index=False, chunksize=tamanho_lote)
+
+
+def carregar_csv(engine, arquivo, tabela, tamanho_lote=TAMANHO_LOTE_SQL):
+    """Copia um CSV das bases (separador ';') para uma tabela, em lotes; útil para montar um banco de teste."""
+    linhas = 0
+    for numero, bloco in enumerate(pd.read_csv(arquivo, sep=';', chunksize=tamanho_lote)):
+        bloco.to_sql(tabela, engine, if_exists='replace' if numero == 0 else 'append', index=False)
+        linhas += len(bloco)
+    return linhas
+
+
+def conferir_agregados(engine, arquivo_transacoes, tabela=TABELA_TRANSACOES):
+    """Compara os agregados do banco com os do pandas sobre o mesmo CSV; devolve a lista de divergências."""
+    dicionario_ids = DicionarioIds()
+    esperado = agregar_transacoes(preparar_transacoes(pd.read_csv(arquivo_transacoes, sep=';'), dicionario_ids))
+    obtido = agregar_no_banco(engine, dicionario_ids, tabela)
+    divergencias = []
+    for nome in ('pagamentos', 'recebimentos', 'pares', 'cubo'):
+        a, b = esperado[nome], obtido[nome]
+        if not a.index.equals(b.index) or not np.allclose(a.to_numpy(dtype=float), b.to_numpy(dtype=float), rtol=1e-9):
+            divergencias.append(nome)
+    a, b = esperado['mensais'], obtido['mensais']
+    if len(a) != len(b) or not (a[['ID_RCBE', 'MES_ANO']].to_numpy() == b[['ID_RCBE', 'MES_ANO']].to_numpy()).all() \
+            or not np.allclose(a['VL'], b['VL'], rtol=1e-9):
+        divergencias.append('mensais')
+    return divergencias
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Carrega as bases em um banco de teste e confere as agregações feitas no SQL.")
+    parser.add_argument('url', help="URL do SQLAlchemy, por exemplo sqlite:///santander.db ou duckdb:///santander.duckdb.")
+    parser.add_argument('--carregar-csv', nargs=2, metavar=('BASE_ID', 'BASE_TRANSACOES'), help="Copia os dois CSVs para as tabelas do banco.")
+    parser.add_argument('--conferir', metavar='BASE_TRANSACOES', help="Compara os agregados calculados no banco com os do pandas sobre este CSV.")
+    args = parser.parse_args()
+
+    engine = criar_conexao(args.url)
+    if args.carregar_csv:
+        arquivo_id, arquivo_transacoes = args.carregar_csv
+        print(f"{carregar_csv(engine, arquivo_id, TABELA_EMPRESAS)} linhas gravadas em '{TABELA_EMPRESAS}'.")
+        print(f"{carregar_csv(engine, arquivo_transacoes, TABELA_TRANSACOES)} linhas gravadas em '{TABELA_TRANSACOES}'.")
+    if args.conferir:
+        divergencias = conferir_agregados(engine, args.conferir)
+        print(f"Agregados divergentes: {divergencias}" if divergencias else "Agregados do banco idênticos aos do pandas.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,219 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import warnings
+import numpy as np
+import pandas as pd
+import plotly.express as px
+from gerador_dados import ARQUIVO_BASE_ID, ARQUIVO_TRANSACOES, empresas_para_linhas, gerar_bases
+from metricas import configurar_metricas, finalizar_etapa, iniciar_etapa
+
+# --- BENCHMARK DE ESCALABILIDADE ---
+# Para cada escala (número de linhas da Base 2) as bases sintéticas são geradas
+# uma vez pelo gerador_dados.py e reaproveitadas nas execuções seguintes. Cada
+# cenário roda em um processo separado, para que o pico de memória medido seja
+# só dele:
+#   - pipeline: PASSOS 1 a 5 do analise_completa.py com a Base 2 em memória;
+#   - blocos:   agregação da Base 2 em blocos (--blocos);
+#   - dashboard: carga dos artefatos e do cubo, construção dos índices e os
+#                caminhos de filtro (página 1) e de consulta por ID (páginas 2 e 3).
+# Cada etapa grava uma linha no arquivo de métricas com o campo 'escala'; no fim
+# são impressas as tabelas de vazão (linhas/s) e de pico de memória por escala,
+# e as curvas são salvas em HTML.
+
+ESCALAS = [10_000, 100_000, 1_000_000, 10_000_000]
+CENARIOS = ['pipeline', 'blocos', 'dashboard']
+DIRETORIO_BENCHMARK = 'benchmark'
+ARQUIVO_RESULTADOS = 'benchmark.jsonl'
+ARQUIVO_CURVAS = 'benchmark_escalabilidade.html'
+N_CONSULTAS = 200
+COLUNAS_DASHBOARD = ['ID', 'DT_REFE', 'MOMENTO_VIDA', 'VL_FATU', 'VL_SLDO', 'IDADE_EMPRESA', 'DS_CNAE', 'PROJECAO_RECEBIMENTO']
+
+
+def diretorio_escala(args, escala):
+    return os.path.join(args.diretorio, f"escala_{escala}_m{args.meses}_t{args.transacoes_por_empresa:g}_a{args.assimetria:g}_c{args.concentracao:g}_s{args.semente}")
+
+
+def preparar_dados(args, escala):
+    """Gera as bases da escala, se ainda não existirem (o gerador é determinístico)."""
+    diretorio = diretorio_escala(args, escala)
+    if os.path.exists(os.path.join(diretorio, ARQUIVO_BASE_ID)) and os.path.exists(os.path.join(diretorio, ARQUIVO_TRANSACOES)):
+        return diretorio
+    n_empresas = empresas_para_linhas(escala, args.meses, args.transacoes_por_empresa)
+    medicao = iniciar_etapa('gerador')
+    _, _, linhas_id, linhas_transacoes = gerar_bases(diretorio, n_empresas, args.meses, args.transacoes_por_empresa,
+                                                     args.assimetria, args.concentracao, args.semente)
+    finalizar_etapa(medicao, linhas_saida=linhas_id + linhas_transacoes, empresas=n_empresas)
+    return diretorio
+
+
+def executar_pipeline(tamanho_bloco):
+    from analise_completa import agregar_transacoes_em_memoria, analisar_estado, carregar_bases, salvar_resultados
+    from estado import criar_estado
+    from identificadores import DicionarioIds
+    dicionario_ids = DicionarioIds()
+    df_id, df_transacoes = carregar_bases(ARQUIVO_BASE_ID, ARQUIVO_TRANSACOES, dicionario_ids)
+    agregados = agregar_transacoes_em_memoria(df_transacoes)
+    estado = criar_estado(df_id, agregados, dicionario_ids)
+    df_final, _ = analisar_estado(estado, usar_cache=False)
+    salvar_resultados(df_final, df_transacoes, dicionario_ids, agregados['cubo'])
+
+
+def executar_blocos(tamanho_bloco):
+    from analise_completa import agregar_transacoes_em_blocos, descartar_partes_em_blocos
+    from identificadores import DicionarioIds
+    agregar_transacoes_em_blocos(ARQUIVO_TRANSACOES, tamanho_bloco, DicionarioIds())
+    # Só a leitura em blocos é medida: as partes pendentes não substituem as do cenário do pipeline.
+    descartar_partes_em_blocos()
+
+
+def filtrar_visao_geral(df, filtro, momentos, faixa_faturamento):
+    """Mesmo caminho da página 'Visão Geral e Prospecção' a cada mudança de filtro."""
+    selecao = filtro.filtrar(momentos, faixa_faturamento)
+    resumo = filtro.resumo(selecao)
+    df.iloc[filtro.amostra_dispersao(selecao, 1000)]
+    df.iloc[filtro.primeiras(selecao, 1000)]
+    return resumo
+
+
+def executar_dashboard(tamanho_bloco):
+    from artefatos import ARTEFATO_EMPRESAS, carregar_artefato
+    from cubo import ARTEFATO_CUBO, ARTEFATO_IDS_CUBO, CuboTransacoes
+    from filtros import FiltroVisaoGeral
+    from indices import IndiceEmpresas
+    from insights import ARTEFATO_OPORTUNIDADES, textos_insights
+    rng = np.random.default_rng(0)
+
+    medicao = iniciar_etapa('dashboard.carregar_dados')
+    df = carregar_artefato(ARTEFATO_EMPRESAS, COLUNAS_DASHBOARD)
+    oportunidades_por_id = carregar_artefato(ARTEFATO_OPORTUNIDADES).set_index('ID').sort_index()
+    medicao['linhas_entrada'] = len(df) + len(oportunidades_por_id)
+    finalizar_etapa(medicao, linhas_saida=len(df) + len(oportunidades_por_id))
+
+    medicao = iniciar_etapa('dashboard.carregar_indices', linhas_entrada=len(df))
+    indice = IndiceEmpresas(df)
+    finalizar_etapa(medicao, linhas_saida=len(indice.ids))
+
+    medicao = iniciar_etapa('dashboard.carregar_filtro', linhas_entrada=len(df))
+    filtro = FiltroVisaoGeral(df)
+    finalizar_etapa(medicao, linhas_saida=len(filtro.momentos))
+
+    medicao = iniciar_etapa('dashboard.carregar_cubo')
+    cubo = CuboTransacoes(carregar_artefato(ARTEFATO_CUBO), carregar_artefato(ARTEFATO_IDS_CUBO)['ID'])
+    medicao['linhas_entrada'] = len(cubo)
+    finalizar_etapa(medicao, linhas_saida=len(cubo))
+
+    # Filtros sorteados: subconjunto não vazio dos momentos e faixa entre dois quantis do faturamento.
+    momentos = filtro.momentos
+    quantis = df['VL_FATU'].quantile(np.linspace(0, 1, 11)).to_numpy()
+    medicao = iniciar_etapa('dashboard.filtro', linhas_entrada=len(df) * N_CONSULTAS)
+    for _ in range(N_CONSULTAS):
+        selecionados = [momento for momento in momentos if rng.random() < 0.6] or momentos[:1]
+        inicio, fim = np.sort(rng.choice(len(quantis), 2, replace=False))
+        filtrar_visao_geral(df, filtro, selecionados, (quantis[inicio], quantis[fim]))
+    finalizar_etapa(medicao, linhas_saida=N_CONSULTAS, consultas=N_CONSULTAS)
+
+    ids = rng.choice(np.asarray(indice.ids, dtype=object), N_CONSULTAS)
+    medicao = iniciar_etapa('dashboard.consulta_individual', linhas_entrada=N_CONSULTAS)
+    for id_empresa in ids:
+        historico = indice.historico(id_empresa)
+        ultimo = historico.iloc[-1]
+        indice.estatisticas_pares(id_empresa, ultimo['DS_CNAE'], ultimo['MOMENTO_VIDA'])
+    finalizar_etapa(medicao, linhas_saida=N_CONSULTAS, consultas=N_CONSULTAS)
+
+    medicao = iniciar_etapa('dashboard.consulta_insights', linhas_entrada=N_CONSULTAS)
+    for id_empresa in ids:
+        textos_insights(oportunidades_por_id.loc[id_empresa])
+    finalizar_etapa(medicao, linhas_saida=N_CONSULTAS, consultas=N_CONSULTAS)
+
+    medicao = iniciar_etapa('dashboard.consulta_fluxos', linhas_entrada=N_CONSULTAS)
+    for id_empresa in ids:
+        cubo.fluxo_mensal(id_empresa)
+        cubo.principais_parceiros(id_empresa, 10)
+    finalizar_etapa(medicao, linhas_saida=N_CONSULTAS, consultas=N_CONSULTAS)
+
+
+EXECUTORES = {'pipeline': executar_pipeline, 'blocos': executar_blocos, 'dashboard': executar_dashboard}
+
+
+def executar_cenario(args):
+    """Ponto de entrada do subprocesso: roda um cenário dentro do diretório da escala."""
+    arquivo_resultados = os.path.abspath(args.resultados)
+    os.chdir(diretorio_escala(args, args.escala))
+    configurar_metricas(arquivo_resultados, origem='benchmark', contexto={'escala': args.escala, 'cenario': args.cenario})
+    warnings.filterwarnings('ignore')
+    EXECUTORES[args.cenario](args.blocos)
+
+
+def resumir(arquivo_resultados, arquivo_curvas=ARQUIVO_CURVAS):
+    """Tabelas de vazão e memória por etapa e escala (da última rodada de cada escala/cenário) e curvas em HTML."""
+    with open(arquivo_resultados, encoding='utf-8') as arquivo:
+        registros = pd.DataFrame([json.loads(linha) for linha in arquivo if linha.strip()])
+    registros = registros[registros['origem'] == 'benchmark']
+    ultimas = registros.groupby(['escala', 'cenario'])['execucao'].transform('max')
+    registros = registros[registros['execucao'] == ultimas].copy()
+    # Consultas do dashboard são medidas em consultas/s; as demais etapas em linhas de entrada
+    # (ou, no gerador, de saída) por segundo.
+    unidades = registros['consultas'] if 'consultas' in registros else pd.Series(np.nan, index=registros.index)
+    registros['VAZAO'] = unidades.fillna(registros['linhas_entrada']).fillna(registros['linhas_saida']) / registros['tempo_parede_s']
+
+    vazao = registros.pivot_table(index='etapa', columns='escala', values='VAZAO', aggfunc='last')
+    tempo = registros.pivot_table(index='etapa', columns='escala', values='tempo_parede_s', aggfunc='last')
+    memoria = registros.pivot_table(index='cenario', columns='escala', values='pico_rss_mb', aggfunc='max')
+    print("\n=== Tempo de parede por etapa (s) ===")
+    print(tempo.round(3).to_string())
+    print("\n=== Vazão por etapa (linhas/s; consultas/s no dashboard) ===")
+    print(vazao.round(0).to_string())
+    print("\n=== Pico de memória por cenário (MB) ===")
+    print(memoria.round(1).to_string())
+
+    fig_vazao = px.line(registros, x='escala', y='VAZAO', color='etapa', markers=True, log_x=True, log_y=True,
+                        labels={'escala': 'Linhas da Base 2', 'VAZAO': 'Vazão'}, title="Vazão por etapa")
+    fig_memoria = px.line(registros.groupby(['escala', 'cenario'], as_index=False)['pico_rss_mb'].max(), x='escala', y='pico_rss_mb',
+                          color='cenario', markers=True, log_x=True, log_y=True,
+                          labels={'escala': 'Linhas da Base 2', 'pico_rss_mb': 'Pico de RSS (MB)'}, title="Pico de memória por cenário")
+    with open(arquivo_curvas, 'w', encoding='utf-8') as arquivo:
+        arquivo.write(fig_vazao.to_html(full_html=False, include_plotlyjs='cdn'))
+        arquivo.write(fig_memoria.to_html(full_html=False, include_plotlyjs=False))
+    print(f"\nCurvas de escalabilidade salvas em '{arquivo_curvas}'.")
+    return vazao, memoria
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de escalabilidade do pipeline e do dashboard com bases sintéticas.")
+    parser.add_argument('--escalas', type=int, nargs='+', default=ESCALAS, help="Linhas da Base 2 de cada rodada (padrão: 10 mil a 10 milhões).")
+    parser.add_argument('--cenarios', nargs='+', choices=CENARIOS, default=CENARIOS)
+    parser.add_argument('--meses', type=int, default=5)
+    parser.add_argument('--transacoes-por-empresa', type=float, default=2, help="Média de pagamentos por empresa e por mês (define o número de empresas de cada escala).")
+    parser.add_argument('--assimetria', type=float, default=1.0)
+    parser.add_argument('--concentracao', type=float, default=0.3)
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--blocos', type=int, default=1_000_000, metavar='LINHAS', help="Tamanho do bloco do cenário 'blocos'.")
+    parser.add_argument('--diretorio', default=DIRETORIO_BENCHMARK, help="Onde ficam as bases geradas e os artefatos de cada escala.")
+    parser.add_argument('--resultados', default=ARQUIVO_RESULTADOS, help="Arquivo JSONL com as métricas de todas as rodadas.")
+    parser.add_argument('--escala', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--cenario', choices=CENARIOS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.cenario:
+        executar_cenario(args)
+        return
+
+    for escala in args.escalas:
+        configurar_metricas(args.resultados, origem='benchmark', contexto={'escala': escala, 'cenario': 'gerador'})
+        preparar_dados(args, escala)
+        # O dashboard lê os artefatos gravados pelo cenário 'pipeline'.
+        for cenario in args.cenarios:
+            print(f"Escala {escala:,} linhas: cenário '{cenario}'...")
+            comando = [sys.executable, os.path.abspath(__file__), '--escala', str(escala), '--cenario', cenario] + sys.argv[1:]
+            processo = subprocess.run(comando)
+            if processo.returncode != 0:
+                # Na maior escala o cenário em memória pode esgotar a RAM; as demais rodadas continuam.
+                print(f"Cenário '{cenario}' falhou na escala {escala:,} (código {processo.returncode}).")
+    resumir(args.resultados)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+import numpy as np
+import pandas as pd
+from agregados import NIVEIS_CUBO, agregar_cubo
+from artefatos import diretorio_pendente, salvar_artefato, salvar_parte
+from ingestao import BLOCOS_POR_REDUCAO
+
+# --- CUBO DE TRANSAÇÕES POR EMPRESA, CONTRAPARTE E MÊS ---
+# O agregado 'cubo' (agregados.py) soma VL e conta as transações de cada
+# (ID_PGTO, ID_RCBE, MES_ANO), e o artefato guarda exatamente uma linha por
+# chave. A direção não é gravada: no dashboard o cubo é indexado pelas duas
+# pontas, e as linhas em que a empresa é pagadora são as suas saídas e as em que
+# ela é recebedora, as suas entradas (com a outra ponta como contraparte).
+# ID_PGTO e ID_RCBE são gravados como os códigos int32 do DicionarioIds, e os
+# IDs em texto ficam em um artefato à parte (ARTEFATO_IDS_CUBO, uma linha por
+# código). Assim todas as partes têm o mesmo esquema, qualquer que seja o
+# tamanho do dicionário, e nenhuma repete a lista de IDs. O dicionário só
+# cresce, então ele é regravado inteiro a cada execução e os códigos das partes
+# antigas continuam valendo. A tabela fica ordenada por pagador e é gravada como
+# artefato colunar particionado: a execução completa substitui as partes e cada
+# execução incremental acrescenta a parte dos seus meses.
+#
+# O cubo tem no máximo uma linha por transação, mas quase todo (pagador,
+# recebedor, mês) tem uma única transação, então ele tem quase tantas linhas
+# quanto a Base 2. Por isso o modo em blocos não o acumula em memória:
+# CuboEmBlocos grava cada mês como parte pendente assim que ele se encerra (com
+# a Base 2 em ordem de mês) e, de qualquer forma, grava tudo o que está aberto a
+# cada BLOCOS_POR_REDUCAO blocos. Se a Base 2 não vier em ordem, ou um mês
+# ocupar muitos blocos, as mesmas chaves ficam em mais de uma parte; as consultas
+# de CuboTransacoes somam as linhas, então o resultado não muda.
+
+ARTEFATO_CUBO = 'cubo_transacoes'
+ARTEFATO_IDS_CUBO = 'cubo_transacoes_ids.arrow'
+DIRECOES = ['ENTRADA', 'SAIDA']
+
+
+def montar_cubo(cubo):
+    """Tabela do agregado (ID_PGTO, ID_RCBE, MES_ANO) -> VL, QT, com os códigos em int32 e ordenada por pagador e mês."""
+    df_cubo = cubo.reset_index()
+    df_cubo = df_cubo.assign(ID_PGTO=df_cubo['ID_PGTO'].astype(np.int32), ID_RCBE=df_cubo['ID_RCBE'].astype(np.int32),
+                             VL=df_cubo['VL'].astype(float), QT=df_cubo['QT'].astype(np.int64))
+    return df_cubo[NIVEIS_CUBO + ['VL', 'QT']].sort_values(['ID_PGTO', 'MES_ANO', 'ID_RCBE'], kind='mergesort', ignore_index=True)
+
+
+def salvar_ids_cubo(dicionario_ids, caminho=ARTEFATO_IDS_CUBO):
+    """Grava os IDs em texto do dicionário, na ordem dos códigos usados nas partes do cubo."""
+    salvar_artefato(pd.DataFrame({'ID': dicionario_ids.ids}), caminho)
+
+
+class CuboEmBlocos:
+    """Cubo do modo em blocos: meses encerrados (anteriores ao menor mês do bloco atual) e, no máximo a cada
+    BLOCOS_POR_REDUCAO blocos, todos os meses abertos são gravados como partes pendentes e saem da memória."""
+
+    def __init__(self, diretorio=ARTEFATO_CUBO):
+        self.diretorio = diretorio_pendente(diretorio)
+        self.partes = 0
+        self.linhas = 0
+        self._abertos = []
+        self._menor_mes = None
+
+    def adicionar(self, bloco):
+        cubo = agregar_cubo(bloco)
+        if cubo.empty:
+            return
+        self._abertos.append(cubo)
+        meses = cubo.index.get_level_values('MES_ANO')
+        self._menor_mes = meses.min() if self._menor_mes is None else min(self._menor_mes, meses.min())
+        if self._menor_mes < meses.min():
+            self._gravar(ate=meses.min())
+        elif len(self._abertos) > BLOCOS_POR_REDUCAO:
+            self._gravar()
+
+    def finalizar(self):
+        """Grava os meses ainda abertos; devolve o número de partes gravadas."""
+        if self._abertos:
+            self._gravar()
+        return self.partes
+
+    def _gravar(self, ate=None):
+        cubo = pd.concat(self._abertos).groupby(level=NIVEIS_CUBO).sum()
+        encerrados = np.ones(len(cubo), dtype=bool) if ate is None else cubo.index.get_level_values('MES_ANO') < ate
+        df_cubo = montar_cubo(cubo[encerrados])
+        salvar_parte(df_cubo, self.diretorio, f'parte-{self.partes:05d}')
+        self.partes += 1
+        self.linhas += len(df_cubo)
+        self._abertos = [] if ate is None else [cubo[~encerrados]]
+        self._menor_mes = ate
+
+
+class CuboTransacoes:
+    def __init__(self, df_cubo, ids):
+        """df_cubo com ID_PGTO e ID_RCBE em códigos; ids são os IDs em texto na ordem dos códigos (ARTEFATO_IDS_CUBO)."""
+        # Partes diferentes (execução completa + meses incrementais) repetem pagadores: uma única reordenação
+        # estável, feita só se necessário, deixa as linhas de cada pagador contíguas e em ordem de mês.
+        pagadores = df_cubo['ID_PGTO'].to_numpy()
+        if len(pagadores) and (np.diff(pagadores) < 0).any():
+            ordem = np.argsort(pagadores, kind='stable')
+            df_cubo, pagadores = df_cubo.take(ordem).reset_index(drop=True), pagadores[ordem]
+        self.df = df_cubo
+        self.ids = pd.Index(ids, dtype='str')
+        codigos = np.arange(len(self.ids) + 1)
+        self._limites_pagador = np.searchsorted(pagadores, codigos)
+        # As linhas de cada recebedor são alcançadas por uma permutação, sem uma segunda cópia da tabela.
+        self._ordem_recebedor = np.argsort(df_cubo['ID_RCBE'].to_numpy(), kind='stable')
+        self._limites_recebedor = np.searchsorted(df_cubo['ID_RCBE'].to_numpy()[self._ordem_recebedor], codigos)
+
+    def __len__(self):
+        return len(self.df)
+
+    def fluxos(self, id_empresa):
+        """Entradas e saídas da empresa (vazio se ela não tem transações), com DIRECAO, CONTRAPARTE e MES_ANO em texto.
+
+        Uma mesma chave pode aparecer em mais de uma parte do artefato; as consultas abaixo somam as linhas.
+        """
+        codigo = self.ids.get_indexer([id_empresa])[0]
+        if codigo < 0:
+            entradas, saidas = self.df.iloc[:0], self.df.iloc[:0]
+        else:
+            entradas = self.df.take(self._ordem_recebedor[self._limites_recebedor[codigo]:self._limites_recebedor[codigo + 1]])
+            saidas = self.df.iloc[self._limites_pagador[codigo]:self._limites_pagador[codigo + 1]]
+        lados = [pd.DataFrame({
+            'ID': id_empresa,
+            'CONTRAPARTE': np.asarray(self.ids.take(linhas[contraparte].to_numpy()), dtype=object),
+            'MES_ANO': linhas['MES_ANO'].astype(str).to_numpy(dtype=object),
+            'DIRECAO': pd.Categorical.from_codes(np.full(len(linhas), DIRECOES.index(direcao)), categories=DIRECOES),
+            'VL': linhas['VL'].to_numpy(),
+            'QT': linhas['QT'].to_numpy(),
+        }) for direcao, linhas, contraparte in (('ENTRADA', entradas, 'ID_PGTO'), ('SAIDA', saidas, 'ID_RCBE'))]
+        return pd.concat(lados, ignore_index=True).sort_values(['MES_ANO', 'DIRECAO', 'CONTRAPARTE'], kind='mergesort', ignore_index=True)
+
+    def principais_parceiros(self, id_empresa, n=10):
+        """As n contrapartes com maior valor total (entradas + saídas), com o valor de cada direção."""
+        fluxos = self.fluxos(id_empresa)
+        por_parceiro = fluxos.groupby(['CONTRAPARTE', 'DIRECAO'], observed=True)[['VL', 'QT']].sum().reset_index()
+        total = por_parceiro.groupby('CONTRAPARTE')['VL'].sum().sort_values(ascending=False, kind='mergesort')
+        principais = total.index[:n]
+        por_parceiro = por_parceiro[por_parceiro['CONTRAPARTE'].isin(principais)]
+        ordem = pd.Categorical(por_parceiro['CONTRAPARTE'], categories=principais)
+        return por_parceiro.assign(ORDEM=ordem.codes).sort_values(['ORDEM', 'DIRECAO'], kind='mergesort').drop(columns='ORDEM')
+
+    def fluxo_mensal(self, id_empresa):
+        """Entradas e saídas (VL e QT) da empresa mês a mês."""
+        fluxos = self.fluxos(id_empresa)
+        return fluxos.groupby(['MES_ANO', 'DIRECAO'], observed=True)[['VL', 'QT']].sum().reset_index()
@@ -1,28 +1,91 @@
+import os
 import streamlit as st
-import pandas as pd
 import plotly.express as px
+from artefatos import ARTEFATO_EMPRESAS, carregar_artefato
+from cubo import ARTEFATO_CUBO, ARTEFATO_IDS_CUBO, CuboTransacoes
+from filtros import FiltroVisaoGeral
+from indices import IndiceEmpresas
+from insights import ARTEFATO_OPORTUNIDADES, textos_insights
+from metricas import ARQUIVO_METRICAS, configurar_metricas, finalizar_etapa, iniciar_etapa
 
 # --- Configuração da Página ---
 st.set_page_config(page_title="Dashboard PJ", layout="wide", initial_sidebar_state="expanded")
 
+# --- Métricas de Desempenho (opcional) ---
+# Com DASHBOARD_METRICAS definido, cada carga de dados e cada renderização de
+# página grava uma linha no arquivo de métricas; DASHBOARD_PERFILAR=<etapa>
+# grava também o perfil cProfile daquela etapa.
+configurar_metricas(os.environ.get('DASHBOARD_METRICAS', ARQUIVO_METRICAS), origem='dashboard',
+                    perfilar=os.environ.get('DASHBOARD_PERFILAR'), ativo='DASHBOARD_METRICAS' in os.environ)
+ETAPAS_PAGINA = {
+    "Visão Geral e Prospecção": 'dashboard.visao_geral',
+    "Análise Individual": 'dashboard.analise_individual',
+    "Insights Comerciais": 'dashboard.insights',
+}
+
 # --- Carregamento e Preparação dos Dados ---
-@st.cache_data
-def carregar_dados():
+# Cada página lê do artefato colunar apenas as colunas que usa. O cache de recurso
+# devolve sempre o mesmo DataFrame (sem cópia por sessão), apoiado no arquivo
+# mapeado em memória, por isso as páginas nunca devem alterá-lo diretamente.
+COLUNAS_POR_PAGINA = {
+    "Visão Geral e Prospecção": ['ID', 'DT_REFE', 'MOMENTO_VIDA', 'VL_FATU', 'VL_SLDO', 'IDADE_EMPRESA', 'DS_CNAE'],
+    "Análise Individual": ['ID', 'DT_REFE', 'MOMENTO_VIDA', 'VL_FATU', 'VL_SLDO', 'IDADE_EMPRESA', 'DS_CNAE', 'PROJECAO_RECEBIMENTO'],
+    "Insights Comerciais": ['ID'],
+}
+
+@st.cache_resource
+def carregar_dados(colunas):
+    medicao = iniciar_etapa('dashboard.carregar_dados')
     try:
-        df = pd.read_csv("empresas_analisadas.csv")
-        df['DT_REFE'] = pd.to_datetime(df['DT_REFE'])
-        df_transacoes = pd.read_csv("transacoes_com_data.csv")
+        df = carregar_artefato(ARTEFATO_EMPRESAS, list(colunas))
     except FileNotFoundError:
-        st.error("Arquivo 'empresas_analisadas.csv' ou 'transacoes_com_data.csv' não encontrado. Execute o script 'analise_completa.py' primeiro.")
-        return None, None
+        st.error(f"Arquivo '{ARTEFATO_EMPRESAS}' não encontrado. Execute o script 'analise_completa.py' primeiro.")
+        return None
 
     # A função de classificar setor foi removida.
-    return df, df_transacoes
+    finalizar_etapa(medicao, linhas_saida=len(df), colunas=len(colunas))
+    return df
 
-df, df_transacoes = carregar_dados()
+@st.cache_resource
+def carregar_indices(colunas):
+    # Índices por ID e por grupo de pares, construídos uma vez por carga de dados.
+    df = carregar_dados(colunas)
+    medicao = iniciar_etapa('dashboard.carregar_indices', linhas_entrada=len(df))
+    indice = IndiceEmpresas(df)
+    finalizar_etapa(medicao, linhas_saida=len(indice.ids))
+    return indice
 
-if df is None:
-    st.stop()
+@st.cache_resource
+def carregar_filtro(colunas):
+    # Blocos por momento de vida ordenados por faturamento, usados pelos filtros da página de visão geral.
+    df = carregar_dados(colunas)
+    medicao = iniciar_etapa('dashboard.carregar_filtro', linhas_entrada=len(df))
+    filtro = FiltroVisaoGeral(df)
+    finalizar_etapa(medicao, linhas_saida=len(filtro.momentos))
+    return filtro
+
+@st.cache_resource
+def carregar_cubo():
+    # Cubo (pagador, recebedor, mês) gerado pelo 'analise_completa.py', no lugar das transações brutas.
+    medicao = iniciar_etapa('dashboard.carregar_cubo')
+    try:
+        df_cubo = carregar_artefato(ARTEFATO_CUBO)
+        ids = carregar_artefato(ARTEFATO_IDS_CUBO)['ID']
+    except FileNotFoundError:
+        return None
+    cubo = CuboTransacoes(df_cubo, ids)
+    finalizar_etapa(medicao, linhas_saida=len(cubo))
+    return cubo
+
+@st.cache_resource
+def carregar_oportunidades():
+    # Tabela de oportunidades calculada em lote pelo 'analise_completa.py', já ordenada por prioridade.
+    try:
+        oportunidades = carregar_artefato(ARTEFATO_OPORTUNIDADES)
+    except FileNotFoundError:
+        st.error(f"Arquivo '{ARTEFATO_OPORTUNIDADES}' não encontrado. Execute o script 'analise_completa.py' primeiro.")
+        return None, None
+    return oportunidades, oportunidades.set_index('ID').sort_index()
 
 # --- Barra Lateral ---
 st.sidebar.title("Sistema de Análise PJ")
@@ -32,6 +95,14 @@ pagina_selecionada = st.sidebar.radio(
 )
 st.sidebar.markdown("---")
 
+colunas_pagina = tuple(COLUNAS_POR_PAGINA[pagina_selecionada])
+df = carregar_dados(colunas_pagina)
+
+if df is None:
+    st.stop()
+
+medicao_pagina = iniciar_etapa(ETAPAS_PAGINA[pagina_selecionada], linhas_entrada=len(df))
+
 
 # ==============================================================================
 # --- PÁGINA 1: VISÃO GERAL E PROSPECÇÃO ---
@@ -40,21 +111,20 @@ if pagina_selecionada == "Visão Geral e Prospecção":
     st.title("Dashboard de Prospecção e Análise de Empresas")
     
     st.sidebar.header("Filtros de Segmentação")
-    momentos = df['MOMENTO_VIDA'].unique()
+    filtro = carregar_filtro(colunas_pagina)
+    momentos = filtro.momentos
     momento_selecionado = st.sidebar.multiselect("Momento de Vida:", options=momentos, default=momentos)
-    faturamento_selecionado = st.sidebar.slider("Faixa de Faturamento Anual (R$):", int(df['VL_FATU'].min()), int(df['VL_FATU'].max()), (int(df['VL_FATU'].min()), int(df['VL_FATU'].max())))
+    faturamento_selecionado = st.sidebar.slider("Faixa de Faturamento Anual (R$):", int(filtro.fatu_min), int(filtro.fatu_max), (int(filtro.fatu_min), int(filtro.fatu_max)))
     
     # --- FILTROS AVANÇADOS REMOVIDOS DAQUI ---
     
-    # Lógica de filtragem simplificada
-    df_filtrado = df[
-        (df['MOMENTO_VIDA'].isin(momento_selecionado)) & 
-        (df['VL_FATU'].between(*faturamento_selecionado))
-    ].copy()
+    # Busca binária da faixa de faturamento no bloco de cada momento de vida, sem copiar o DataFrame
+    selecao = filtro.filtrar(momento_selecionado, faturamento_selecionado)
+    resumo = filtro.resumo(selecao)
     
-    total_empresas = df_filtrado['ID'].nunique()
-    faturamento_medio = df_filtrado['VL_FATU'].mean()
-    idade_media = df_filtrado['IDADE_EMPRESA'].mean()
+    total_empresas = resumo['TOTAL_EMPRESAS']
+    faturamento_medio = resumo['FATURAMENTO_MEDIO']
+    idade_media = resumo['IDADE_MEDIA']
     col1, col2, col3 = st.columns(3)
     col1.metric("Total de Empresas Únicas", f"{total_empresas:,}".replace(",", "."))
     col2.metric("Faturamento Médio (por registro)", f"R$ {faturamento_medio:,.2f}".replace(",", "X").replace(".", ",").replace("X", "."))
@@ -65,42 +135,38 @@ if pagina_selecionada == "Visão Geral e Prospecção":
     with col_graf1:
         # Gráfico de Macro-Setor foi revertido para o de Momento de Vida
         st.subheader("Distribuição por Momento de Vida")
-        fig_bar = px.bar(df_filtrado['MOMENTO_VIDA'].value_counts().reset_index(), x='MOMENTO_VIDA', y='count', color='MOMENTO_VIDA', text_auto=True, labels={'count': 'Registros', 'MOMENTO_VIDA': 'Momento de Vida'})
+        fig_bar = px.bar(resumo['POR_MOMENTO'].reset_index(), x='MOMENTO_VIDA', y='count', color='MOMENTO_VIDA', text_auto=True, labels={'count': 'Registros', 'MOMENTO_VIDA': 'Momento de Vida'})
         st.plotly_chart(fig_bar, use_container_width=True)
     with col_graf2:
         st.subheader("Faturamento vs. Idade")
-        if not df_filtrado.empty:
-            df_filtrado['VL_SLDO_TAMANHO'] = df_filtrado['VL_SLDO'] - df_filtrado['VL_SLDO'].min()
-        else:
-            df_filtrado['VL_SLDO_TAMANHO'] = pd.Series(dtype='float64')
-        # Usando sample para evitar sobrecarga do gráfico com muitos pontos
-        amostra_grafico = df_filtrado.sample(min(1000, len(df_filtrado)))
+        # Amostra estratificada e determinística (com os extremos) para evitar sobrecarga do gráfico com muitos pontos
+        amostra_grafico = df.iloc[filtro.amostra_dispersao(selecao, 1000)].copy()
+        amostra_grafico['VL_SLDO_TAMANHO'] = amostra_grafico['VL_SLDO'] - resumo['SALDO_MINIMO']
         fig_scatter = px.scatter(amostra_grafico, x='IDADE_EMPRESA', y='VL_FATU', color='MOMENTO_VIDA', hover_name='ID', size='VL_SLDO_TAMANHO', hover_data={'VL_SLDO': ':,.2f'}, labels={'IDADE_EMPRESA': 'Idade (Anos)', 'VL_FATU': 'Faturamento (R$)'})
         st.plotly_chart(fig_scatter, use_container_width=True)
         
     with st.expander("Ver Amostra dos Dados Filtrados"):
         # Removido 'MACRO_SETOR' da visualização da tabela
-        st.dataframe(df_filtrado[['ID', 'DT_REFE', 'MOMENTO_VIDA', 'VL_FATU', 'IDADE_EMPRESA', 'DS_CNAE']].head(1000).style.format({'VL_FATU': 'R$ {:,.2f}'}))
-        st.caption(f"Exibindo as primeiras 1.000 de {len(df_filtrado)} registros encontrados.")
+        st.dataframe(df.iloc[filtro.primeiras(selecao, 1000)][['ID', 'DT_REFE', 'MOMENTO_VIDA', 'VL_FATU', 'IDADE_EMPRESA', 'DS_CNAE']].style.format({'VL_FATU': 'R$ {:,.2f}'}))
+        st.caption(f"Exibindo as primeiras 1.000 de {resumo['TOTAL_REGISTROS']} registros encontrados.")
 
 # ==============================================================================
 # --- PÁGINA 2: ANÁLISE INDIVIDUAL ---
 # ==============================================================================
 elif pagina_selecionada == "Análise Individual":
-    # (Esta página não foi alterada, mas o código é incluído para ser completo)
     st.title("Análise Individual da Empresa")
-    id_unicos = sorted(df['ID'].unique())
-    id_pesquisado = st.selectbox("Selecione o ID da Empresa:", options=id_unicos)
+    indice = carregar_indices(colunas_pagina)
+    id_pesquisado = st.selectbox("Selecione o ID da Empresa:", options=indice.ids)
 
     if id_pesquisado:
-        dados_empresa = df[df['ID'] == id_pesquisado].sort_values('DT_REFE')
+        dados_empresa = indice.historico(id_pesquisado)
         ultimo_registro = dados_empresa.iloc[-1]
         
         st.header(f"Resultados para: {ultimo_registro['ID']}")
         st.markdown(f"**CNAE:** {ultimo_registro['DS_CNAE']}")
         st.markdown("---")
         
-        tab1, tab2 = st.tabs(["Visão Geral e Histórico", "Comparação com Pares"])
+        tab1, tab2, tab3 = st.tabs(["Visão Geral e Histórico", "Comparação com Pares", "Parceiros e Fluxos"])
         
         with tab1:
             st.subheader("Métricas Chave do Período")
@@ -120,13 +186,13 @@ elif pagina_selecionada == "Análise Individual":
             st.subheader("Benchmarking de Performance vs. Pares do Setor")
             momento_atual = ultimo_registro['MOMENTO_VIDA']
             cnae_atual = ultimo_registro['DS_CNAE']
-            df_peers = df[(df['DS_CNAE'] == cnae_atual) & (df['MOMENTO_VIDA'] == momento_atual) & (df['ID'] != id_pesquisado)]
+            pares = indice.estatisticas_pares(id_pesquisado, cnae_atual, momento_atual)
             
-            if df_peers.empty:
+            if pares is None:
                 st.warning("Não foram encontrados pares com o mesmo CNAE e Momento de Vida para comparação.")
             else:
-                peer_avg_fatu = df_peers['VL_FATU'].mean()
-                peer_avg_saldo = df_peers['VL_SLDO'].mean()
+                peer_avg_fatu = pares['VL_FATU_MEDIO']
+                peer_avg_saldo = pares['VL_SLDO_MEDIO']
                 delta_fatu_str, delta_saldo_str = "N/A", "N/A"
                 if peer_avg_fatu > 0:
                     delta_fatu_val = ((ultimo_registro['VL_FATU'] - peer_avg_fatu) / peer_avg_fatu) * 100
@@ -138,44 +204,52 @@ elif pagina_selecionada == "Análise Individual":
                 col1, col2 = st.columns(2)
                 col1.metric(f"Faturamento Anual ({momento_atual})", f"R$ {ultimo_registro['VL_FATU']:,.2f}".replace(",", "X").replace(".", ",").replace("X", "."), delta=delta_fatu_str)
                 col2.metric("Saldo Médio (no período)", f"R$ {dados_empresa['VL_SLDO'].mean():,.2f}".replace(",", "X").replace(".", ",").replace("X", "."), delta=delta_saldo_str)
-                st.caption(f"A comparação é feita com {len(df_peers['ID'].unique())} empresas do setor '{cnae_atual}' classificadas como '{momento_atual}'.")
+                st.caption(f"A comparação é feita com {pares['N_EMPRESAS']} empresas do setor '{cnae_atual}' classificadas como '{momento_atual}'.")
+
+        with tab3:
+            cubo = carregar_cubo()
+            if cubo is None:
+                st.warning(f"Pasta '{ARTEFATO_CUBO}' não encontrada. Execute o script 'analise_completa.py' novamente para gerar o cubo de transações.")
+            else:
+                fluxo_mensal = cubo.fluxo_mensal(id_pesquisado)
+                if fluxo_mensal.empty:
+                    st.info("Nenhuma transação encontrada para esta empresa.")
+                else:
+                    rotulos_fluxo = {'VL': 'Valor (R$)', 'QT': 'Transações', 'MES_ANO': 'Mês', 'DIRECAO': 'Direção', 'CONTRAPARTE': 'Parceiro'}
+                    st.subheader("Entradas e Saídas Mensais")
+                    fig_fluxo = px.bar(fluxo_mensal, x='MES_ANO', y='VL', color='DIRECAO', barmode='group', hover_data=['QT'], labels=rotulos_fluxo)
+                    st.plotly_chart(fig_fluxo, use_container_width=True)
+
+                    st.subheader("Principais Parceiros (valor total transacionado)")
+                    parceiros = cubo.principais_parceiros(id_pesquisado, 10)
+                    fig_parceiros = px.bar(parceiros, x='VL', y='CONTRAPARTE', color='DIRECAO', orientation='h', hover_data=['QT'], labels=rotulos_fluxo)
+                    # Maior parceiro no topo do gráfico
+                    fig_parceiros.update_yaxes(categoryorder='array', categoryarray=parceiros['CONTRAPARTE'].unique()[::-1])
+                    st.plotly_chart(fig_parceiros, use_container_width=True)
 
 # ==============================================================================
 # --- PÁGINA 3: INSIGHTS COMERCIAIS ---
 # ==============================================================================
 elif pagina_selecionada == "Insights Comerciais":
-    # (Esta página não foi alterada, mas o código é incluído para ser completo)
     st.title("Insights para Abordagem Comercial")
-    id_unicos = sorted(df['ID'].unique())
-    id_pesquisado = st.selectbox("Selecione o ID da Empresa para gerar insights:", options=id_unicos)
+    oportunidades, oportunidades_por_id = carregar_oportunidades()
+    if oportunidades is None:
+        st.stop()
+
+    with st.expander("Ver Ranking de Oportunidades da Carteira"):
+        st.dataframe(oportunidades[['PRIORIDADE', 'ID', 'DS_CNAE', 'MOMENTO_VIDA', 'VL_FATU', 'N_OPORTUNIDADES', 'PONTUACAO']].head(1000).style.format({'VL_FATU': 'R$ {:,.2f}'}), hide_index=True)
+        st.caption(f"Exibindo as 1.000 empresas de maior prioridade entre {len(oportunidades)}.")
+
+    id_pesquisado = st.selectbox("Selecione o ID da Empresa para gerar insights:", options=oportunidades_por_id.index)
 
     if id_pesquisado:
-        dados_empresa = df[df['ID'] == id_pesquisado].sort_values('DT_REFE')
-        ultimo_registro = dados_empresa.iloc[-1]
-        
-        # A lógica para gerar insights aqui pode precisar de um ajuste se ela usa 'MACRO_SETOR'
-        # Verificando a função...
-        def gerar_insights(empresa, historico):
-            # Esta função não usa 'MACRO_SETOR', então está OK.
-            insights = []
-            saldo_medio = historico['VL_SLDO'].mean()
-            if saldo_medio < 0:
-                insights.append(f"**Ponto de Atenção: Fluxo de Caixa Negativo**\n\n- O saldo médio da empresa nos últimos meses foi de **R$ {saldo_medio:,.2f}**. Isso indica uma forte necessidade de capital de giro.\n\n- **Produto Sugerido:** Oferta proativa de **Capital de Giro** com taxas competitivas para estabilizar o fluxo de caixa.")
-            elif saldo_medio < (empresa['VL_FATU'] / 12 * 0.5):
-                insights.append(f"**Oportunidade: Otimização de Caixa**\n\n- A empresa opera com um saldo médio de **R$ {saldo_medio:,.2f}**, que é relativamente baixo para seu faturamento.\n\n- **Produto Sugerido:** Apresentar soluções de **Gestão de Caixa (Cash Management)** e **Investimentos de Curto Prazo**.")
-            if empresa['NIVEL_DEPENDENCIA'] > 0.4:
-                insights.append(f"**Risco de Concentração**\n\n- **{empresa['NIVEL_DEPENDENCIA']:.1%}** das transações da empresa estão concentradas em um único parceiro comercial.\n\n- **Argumento de Venda:** Posicionar o banco como um parceiro estratégico para mitigar riscos, oferecendo **Seguro de Crédito** ou consultoria para **diversificação de recebíveis**.")
-            if empresa['CENTRALIDADE'] > df['CENTRALIDADE'].quantile(0.85):
-                insights.append(f"**Oportunidade Estratégica: Empresa-Hub**\n\n- Esta empresa é um **hub** em sua rede, com alta conectividade.\n\n- **Produto Sugerido:** Oferta de **Plataforma de Pagamentos Automatizados** e **Gestão de Cobranças**.")
-            if empresa['MOMENTO_VIDA'] == 'Em Crescimento':
-                insights.append(f"**Apoio ao Crescimento**\n\n- A empresa está classificada como 'Em Crescimento', indicando uma fase de expansão que demanda investimentos.\n\n- **Produto Sugerido:** Linhas de crédito para **investimento em ativos (FINAME, BNDES)**.")
-            if not insights:
-                insights.append("**Perfil Estável**\n\n- A empresa apresenta um perfil financeiro estável. O foco da abordagem deve ser no **relacionamento e na oferta de produtos que superem a concorrência**.")
-            return insights
-
-        st.header(f"Sugestões de Abordagem para: {ultimo_registro['ID']}")
-        st.markdown(f"**Setor (CNAE):** {ultimo_registro['DS_CNAE']} | **Momento de Vida Atual:** {ultimo_registro['MOMENTO_VIDA']}")
+        ultimo_registro = oportunidades_por_id.loc[id_pesquisado]
+
+        st.header(f"Sugestões de Abordagem para: {id_pesquisado}")
+        st.markdown(f"**Setor (CNAE):** {ultimo_registro['DS_CNAE']} | **Momento de Vida Atual:** {ultimo_registro['MOMENTO_VIDA']} | **Prioridade na Carteira:** {ultimo_registro['PRIORIDADE']}º")
         st.markdown("---")
-        lista_insights = gerar_insights(ultimo_registro, dados_empresa)
+        lista_insights = textos_insights(ultimo_registro)
         for insight in lista_insights:
-            st.info(insight)
\ No newline at end of file
+            st.info(insight)
+
+finalizar_etapa(medicao_pagina)
\ No newline at end of file
@@ -0,0 +1,80 @@
+import glob
+import json
+import os
+import pandas as pd
+from agregados import combinar_agregados
+from projecao import atualizar_resumo, resumir_ultimos_meses
+
+# --- ESTADO DO MODO INCREMENTAL ---
+# Guarda entre execuções tudo o que é preciso para processar apenas o mês novo:
+# o histórico de snapshots da Base 1 já preparado, os agregados de transações
+# por empresa e por par, o resumo dos dois últimos meses de recebimentos e o
+# dicionário de IDs, para que os meses novos recebam os mesmos códigos.
+#
+# Os agregados têm o tamanho da carteira e são regravados a cada execução. O
+# histórico de snapshots só cresce: ele é gravado em partes (pasta base_id/), e
+# uma execução incremental acrescenta apenas a parte com os snapshots novos.
+
+DIRETORIO_ESTADO = 'estado_incremental'
+COMPONENTES = ('pagamentos', 'recebimentos', 'pares', 'resumo_projecao', 'ids')
+PASTA_BASE_ID = 'base_id'
+
+
+def criar_estado(df_id, agregados, dicionario_ids):
+    """Monta o estado a partir de uma execução completa (df_id e agregados codificados com dicionario_ids)."""
+    meses = agregados['mensais']['MES_ANO'].dropna()
+    return {
+        'base_id': df_id,
+        'pagamentos': agregados['pagamentos'],
+        'recebimentos': agregados['recebimentos'],
+        'pares': agregados['pares'],
+        'resumo_projecao': resumir_ultimos_meses(agregados['mensais']),
+        'ids': dicionario_ids,
+        'ultimo_mes': meses.max() if not meses.empty else None,
+    }
+
+
+def atualizar_estado(estado, df_id_novo, agregados_novos):
+    """Soma o mês novo (codificado com estado['ids']) ao estado; o custo depende só do tamanho do mês e do número de empresas/pares."""
+    meses_novos = agregados_novos['mensais']['MES_ANO'].dropna()
+    if estado['ultimo_mes'] is not None and (meses_novos <= estado['ultimo_mes']).any():
+        raise ValueError(f"As transações novas contêm meses já processados (último mês no estado: {estado['ultimo_mes']}).")
+
+    novo_estado = combinar_agregados(estado, agregados_novos)
+    novo_estado['resumo_projecao'] = atualizar_resumo(estado['resumo_projecao'], agregados_novos['mensais'])
+    novo_estado['ids'] = estado['ids']
+    novo_estado['base_id_novo'] = estado['base_id'].iloc[:0] if df_id_novo is None else df_id_novo
+    novo_estado['base_id'] = estado['base_id'] if df_id_novo is None else pd.concat([estado['base_id'], df_id_novo], ignore_index=True)
+    novo_estado['ultimo_mes'] = meses_novos.max() if not meses_novos.empty else estado['ultimo_mes']
+    return novo_estado
+
+
+def salvar_estado(estado, diretorio=DIRETORIO_ESTADO):
+    """Grava o estado; de um estado atualizado (com 'base_id_novo') só os snapshots novos são gravados do histórico."""
+    pasta = os.path.join(diretorio, PASTA_BASE_ID)
+    os.makedirs(pasta, exist_ok=True)
+    for nome in COMPONENTES:
+        pd.to_pickle(estado[nome], os.path.join(diretorio, f'{nome}.pkl'))
+    partes = sorted(glob.glob(os.path.join(pasta, '*.pkl')))
+    if 'base_id_novo' not in estado:
+        for parte in partes:
+            os.remove(parte)
+        pd.to_pickle(estado['base_id'], os.path.join(pasta, 'parte-00000.pkl'))
+    elif len(estado['base_id_novo']):
+        pd.to_pickle(estado['base_id_novo'], os.path.join(pasta, f'parte-{len(partes):05d}.pkl'))
+    with open(os.path.join(diretorio, 'meta.json'), 'w', encoding='utf-8') as arquivo:
+        ultimo_mes = None if estado['ultimo_mes'] is None else str(estado['ultimo_mes'])
+        json.dump({'ultimo_mes': ultimo_mes}, arquivo)
+
+
+def carregar_estado(diretorio=DIRETORIO_ESTADO):
+    """Lê o estado salvo; levanta FileNotFoundError se ainda não houve execução completa."""
+    estado = {nome: pd.read_pickle(os.path.join(diretorio, f'{nome}.pkl')) for nome in COMPONENTES}
+    partes = sorted(glob.glob(os.path.join(diretorio, PASTA_BASE_ID, '*.pkl')))
+    if not partes:
+        raise FileNotFoundError(os.path.join(diretorio, PASTA_BASE_ID))
+    estado['base_id'] = pd.concat([pd.read_pickle(parte) for parte in partes], ignore_index=True)
+    with open(os.path.join(diretorio, 'meta.json'), encoding='utf-8') as arquivo:
+        ultimo_mes = json.load(arquivo)['ultimo_mes']
+    estado['ultimo_mes'] = None if ultimo_mes is None else pd.Period(ultimo_mes, freq='M')
+    return estado
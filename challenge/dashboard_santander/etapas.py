@@ -0,0 +1,64 @@
+import pandas as pd
+from momento_vida import prever, treinar_modelo
+from pipeline import Etapa
+from projecao import projetar
+from rede import RedeTransacoes
+
+# --- ETAPAS DO PIPELINE DE ANÁLISE ---
+# Os PASSOS 1 a 4 declarados como um DAG para o pipeline.py. Momento de vida,
+# rede e projeção não dependem uns dos outros; a rede e a projeção nem precisam
+# da junção, só dos agregados de transações. A montagem junta as saídas na
+# tabela final. O código de cada função de etapa já entra na chave de cache; ao
+# mudar uma função chamada por ela (por exemplo em momento_vida.py ou rede.py)
+# de forma que altere o resultado, incremente a versão da etapa. A junção e a
+# montagem são baratas e não são gravadas no cache.
+#
+#   base_id, pagamentos, recebimentos -> juncao -> momento_vida --\
+#   pares, pagamentos, recebimentos ----------------> rede -------> montagem
+#   resumo_projecao ------------------------------> projecao ----/
+
+
+def juncao(base_id, pagamentos, recebimentos):
+    """PASSO 1: cada snapshot da Base 1 com os totais de pagamentos e recebimentos da empresa."""
+    df_base = base_id.merge(pagamentos, left_on='ID', right_index=True, how='left')
+    df_base = df_base.merge(recebimentos, left_on='ID', right_index=True, how='left')
+    df_base.fillna(0, inplace=True)
+    return df_base
+
+
+def classificar_momento_vida(df_base, modo='treinar', n_clusters=4, modelo=None):
+    """PASSO 2: treina o modelo ou apenas aplica o modelo recebido."""
+    if modo != 'prever':
+        modelo = treinar_modelo(df_base, n_clusters=n_clusters)
+    clusters, rotulos = prever(modelo, df_base)
+    return {'CLUSTER': clusters, 'MOMENTO_VIDA': rotulos, 'modelo': modelo}
+
+
+def metricas_rede(pares, pagamentos, recebimentos):
+    """PASSO 3: centralidade de grau e nível de dependência de cada empresa da rede."""
+    rede = RedeTransacoes(pares)
+    return pd.concat([rede.centralidade_grau(), rede.dependencia(pagamentos['VL_PAGAMENTOS'], recebimentos['VL_RECEBIMENTOS'])], axis=1)
+
+
+def montagem(df_base, momento, rede, projecoes):
+    """Junta as saídas dos PASSOS 2, 3 e 4 na tabela final, na ordem de colunas original."""
+    df_final = df_base.copy()
+    df_final['CLUSTER'], df_final['MOMENTO_VIDA'] = momento['CLUSTER'], momento['MOMENTO_VIDA']
+    df_final['CENTRALIDADE'] = df_final['ID'].map(rede['CENTRALIDADE']).fillna(0)
+    df_final['NIVEL_DEPENDENCIA'] = df_final['ID'].map(rede['NIVEL_DEPENDENCIA']).fillna(0)
+    df_final['PROJECAO_RECEBIMENTO'] = df_final['ID'].map(projecoes).fillna(0)
+    return df_final
+
+
+def montar_etapas(modo_momento, n_clusters, regra_projecao, parametros_projecao, modelo=None):
+    """Declara o DAG; só os parâmetros que afetam cada etapa entram na chave de cache dela."""
+    parametros_momento = {'modo': modo_momento, 'n_clusters': n_clusters}
+    if modo_momento == 'prever':
+        parametros_momento['modelo'] = modelo
+    return [
+        Etapa('juncao', juncao, ['base_id', 'pagamentos', 'recebimentos'], em_paralelo=False, cache=False, metrica='passo1.juncao'),
+        Etapa('momento_vida', classificar_momento_vida, ['juncao'], parametros_momento, metrica='passo2.momento_vida'),
+        Etapa('rede', metricas_rede, ['pares', 'pagamentos', 'recebimentos'], metrica='passo3.rede'),
+        Etapa('projecao', projetar, ['resumo_projecao'], {'regra': regra_projecao, **parametros_projecao}, metrica='passo4.projecao'),
+        Etapa('montagem', montagem, ['juncao', 'momento_vida', 'rede', 'projecao'], em_paralelo=False, cache=False, metrica='passo4.montagem'),
+    ]
@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+
+# --- MOTOR DE FILTROS DA VISÃO GERAL ---
+# Construído uma vez por carga de dados, responde a cada mudança de filtro sem
+# varrer nem copiar o DataFrame:
+#   - as linhas são reordenadas uma única vez por (MOMENTO_VIDA, VL_FATU), de
+#     modo que cada momento de vida ocupa um bloco contíguo, ordenado por
+#     faturamento;
+#   - a seleção é, para cada momento escolhido no multiselect, a fatia do seu
+#     bloco dentro da faixa do slider, encontrada por busca binária
+#     (np.searchsorted). Nenhuma máscara do tamanho da base é montada;
+#   - as métricas saem de somas e contagens sobre essas fatias contíguas.
+# Para o gráfico de dispersão, a amostra é estratificada e determinística: cada
+# momento de vida recebe uma cota proporcional ao seu número de registros (com
+# um mínimo), os pontos são tomados em intervalos regulares ao longo do
+# faturamento e os extremos de faturamento e idade de cada momento entram
+# sempre. O gráfico fica com cerca de n_pontos pontos, não muda entre execuções
+# e não perde os outliers, por maior que seja o conjunto filtrado.
+
+
+class FiltroVisaoGeral:
+    def __init__(self, df):
+        codigos_momento, momentos = pd.factorize(df['MOMENTO_VIDA'])
+        self.momentos = list(momentos)
+        faturamento = df['VL_FATU'].to_numpy(dtype=float)
+        self._ordem = np.lexsort((faturamento, codigos_momento))
+        self._faturamento = faturamento[self._ordem]
+        self._idade = df['IDADE_EMPRESA'].to_numpy(dtype=float)[self._ordem]
+        self._saldo = df['VL_SLDO'].to_numpy(dtype=float)[self._ordem]
+        codigos_id, ids = pd.factorize(df['ID'])
+        self._codigos_id = codigos_id[self._ordem]
+        self._n_ids = len(ids)
+
+        # Limites do bloco de cada momento (linhas sem momento, código -1, ficam antes do primeiro).
+        limites = np.searchsorted(codigos_momento[self._ordem], np.arange(len(self.momentos) + 1))
+        self._blocos = {momento: (limites[codigo], limites[codigo + 1]) for codigo, momento in enumerate(self.momentos)}
+        validos = faturamento[~np.isnan(faturamento)]
+        self.fatu_min = validos.min() if len(validos) else 0.0
+        self.fatu_max = validos.max() if len(validos) else 0.0
+
+    def filtrar(self, momentos, faixa_faturamento):
+        """Seleção: lista de (momento, início, fim) com as fatias de cada momento dentro da faixa (inclusiva)."""
+        selecao = []
+        for momento in momentos:
+            if momento not in self._blocos:
+                continue
+            inicio_bloco, fim_bloco = self._blocos[momento]
+            bloco = self._faturamento[inicio_bloco:fim_bloco]
+            inicio = inicio_bloco + np.searchsorted(bloco, faixa_faturamento[0], side='left')
+            fim = max(inicio, inicio_bloco + np.searchsorted(bloco, faixa_faturamento[1], side='right'))
+            if fim > inicio:
+                selecao.append((momento, inicio, fim))
+        return selecao
+
+    def resumo(self, selecao):
+        """Registros, empresas únicas, médias (NaN sem registros), saldo mínimo e registros por momento de vida."""
+        marcados = np.zeros(self._n_ids, dtype=bool)
+        registros = soma_faturamento = soma_idade = n_idade = 0
+        saldo_minimo = np.nan
+        for _, inicio, fim in selecao:
+            marcados[self._codigos_id[inicio:fim]] = True
+            registros += fim - inicio
+            soma_faturamento += self._faturamento[inicio:fim].sum()
+            idade = self._idade[inicio:fim]
+            soma_idade += np.nansum(idade)
+            n_idade += np.count_nonzero(~np.isnan(idade))
+            saldo_minimo = np.fmin(saldo_minimo, np.nanmin(self._saldo[inicio:fim], initial=np.inf))
+        por_momento = pd.Series(
+            [fim - inicio for _, inicio, fim in selecao],
+            index=pd.Index([momento for momento, _, _ in selecao], name='MOMENTO_VIDA'),
+            name='count',
+            dtype='int64',
+        )
+        return {
+            'TOTAL_REGISTROS': registros,
+            'TOTAL_EMPRESAS': int(marcados.sum()),
+            'FATURAMENTO_MEDIO': soma_faturamento / registros if registros else np.nan,
+            'IDADE_MEDIA': soma_idade / n_idade if n_idade else np.nan,
+            'SALDO_MINIMO': saldo_minimo if np.isfinite(saldo_minimo) else 0.0,
+            'POR_MOMENTO': por_momento.sort_values(ascending=False, kind='stable'),
+        }
+
+    def amostra_dispersao(self, selecao, n_pontos=1000):
+        """Posições no DataFrame original de uma amostra estratificada por momento de vida e determinística."""
+        total = sum(fim - inicio for _, inicio, fim in selecao)
+        minimo = n_pontos // (4 * max(1, len(selecao)))
+        escolhidas = []
+        for _, inicio, fim in selecao:
+            tamanho = fim - inicio
+            cota = min(tamanho, max(minimo, int(n_pontos * tamanho / total)))
+            escolhidas.append(inicio + np.linspace(0, tamanho - 1, cota).round().astype(int))
+            # Extremos de faturamento (pontas da fatia) e de idade do momento.
+            escolhidas.append([inicio, fim - 1])
+            idade = self._idade[inicio:fim]
+            if not np.isnan(idade).all():
+                escolhidas.append([inicio + np.nanargmin(idade), inicio + np.nanargmax(idade)])
+        if not escolhidas:
+            return np.array([], dtype=np.intp)
+        return np.unique(self._ordem[np.concatenate(escolhidas).astype(np.intp)])
+
+    def primeiras(self, selecao, n=1000):
+        """Posições das n primeiras linhas selecionadas na ordem original do DataFrame (para a tabela de amostra)."""
+        if not selecao:
+            return np.array([], dtype=np.intp)
+        posicoes = np.concatenate([self._ordem[inicio:fim] for _, inicio, fim in selecao])
+        if len(posicoes) > n:
+            posicoes = np.partition(posicoes, n - 1)[:n]
+        return np.sort(posicoes)
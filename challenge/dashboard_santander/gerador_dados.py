@@ -0,0 +1,168 @@
+import argparse
+import math
+import os
+import numpy as np
+import pandas as pd
+
+# --- GERADOR DETERMINÍSTICO DE BASES SINTÉTICAS ---
+# Gera a Base 1 (snapshots mensais das empresas) e a Base 2 (transações) nos
+# mesmos layouts dos arquivos originais, em qualquer escala. Com a mesma
+# semente e os mesmos parâmetros os arquivos saem idênticos: cada mês usa seu
+# próprio gerador aleatório, então o resultado não depende do tamanho dos
+# blocos gravados. As distribuições imitam a amostra 'Base 1 - ID.csv':
+# faturamento log-normal e constante por empresa, saldo mensal entre -15% e
+# +15% do faturamento e data de abertura entre 1994 e 2024.
+#
+# A assimetria dos parceiros tem dois controles:
+#   - assimetria: expoente da lei de potência da popularidade dos recebedores
+#     (0 = uniforme; 1 = Zipf, com poucos hubs concentrando os recebimentos);
+#   - concentracao: fração dos pagamentos de cada empresa que vai sempre para o
+#     mesmo parceiro principal (o que gera NIVEL_DEPENDENCIA alto).
+
+CNAES = [
+    'Administração pública', 'Armazenamento geral', 'Atividades de bancos múltiplos', 'Atividades hospitalares',
+    'Comércio atacadista de alimentos', 'Comércio atacadista de bebidas', 'Comércio atacadista de calçados',
+    'Comércio atacadista de medicamentos', 'Comércio atacadista de tecidos', 'Comércio varejista de alimentos',
+    'Comércio varejista de combustíveis', 'Construção de barragens', 'Construção de edifícios', 'Construção de rodovias',
+    'Consultoria empresarial', 'Correios e entregas expressas', 'Cultivo de arroz', 'Cultivo de milho', 'Cultivo de soja',
+    'Cultivo de trigo', 'Defesa nacional', 'Distribuição de energia elétrica', 'Educação superior', 'Engenharia civil',
+    'Extração de minério de ferro', 'Extração de petróleo e gás natural', 'Fabricação de automóveis',
+    'Fabricação de caminhões e ônibus', 'Fabricação de móveis', 'Fabricação de papel', 'Fabricação de produtos químicos',
+    'Geração de energia elétrica', 'Hotéis e pousadas', 'Montagem industrial', 'Obras de infraestrutura elétrica',
+    'Padaria e confeitaria', 'Planos de saúde', 'Produção cinematográfica', 'Produção de alumínio',
+    'Produção de ferro-gusa', 'Restaurantes e similares', 'Saneamento básico', 'Seguros de vida',
+    'Serviços de tecnologia da informação', 'Telecomunicações sem fio', 'Televisão aberta', 'Televisão por assinatura',
+    'Transporte ferroviário de carga', 'Transporte rodoviário de carga',
+]
+TIPOS_TRANSACAO = ['PIX', 'TED', 'BOLETO', 'DOC']
+PROBABILIDADES_TRANSACAO = [0.55, 0.2, 0.2, 0.05]
+MES_INICIAL = '2025-01'
+ARQUIVO_BASE_ID = 'Base 1 - ID.csv'
+ARQUIVO_TRANSACOES = 'Base 2 - Transações.csv'
+
+
+def _gerador(semente, *chaves):
+    return np.random.default_rng([semente, *chaves])
+
+
+def _sujar_ids(ids, fracao, rng):
+    """Reproduz os problemas de digitação que a limpeza de IDs corrige: minúsculas e espaços nas pontas."""
+    ids = ids.copy()
+    sujos = np.flatnonzero(rng.random(len(ids)) < fracao)
+    metade = len(sujos) // 2
+    ids[sujos[:metade]] = [id_empresa.lower() for id_empresa in ids[sujos[:metade]]]
+    ids[sujos[metade:]] = [f' {id_empresa} ' for id_empresa in ids[sujos[metade:]]]
+    return ids
+
+
+def meses_referencia(n_meses):
+    """Últimos dias de cada mês a partir de MES_INICIAL, como na coluna DT_REFE das bases."""
+    return pd.period_range(MES_INICIAL, periods=n_meses, freq='M').to_timestamp(how='end').normalize()
+
+
+def empresas_para_linhas(linhas_transacoes, n_meses, transacoes_por_empresa):
+    """Número de empresas para que a Base 2 tenha aproximadamente linhas_transacoes linhas."""
+    return max(10, math.ceil(linhas_transacoes / (n_meses * transacoes_por_empresa)))
+
+
+def gerar_empresas(n_empresas, semente=42):
+    """Atributos fixos de cada empresa: ID, faturamento anual, data de abertura e CNAE."""
+    rng = _gerador(semente, 0)
+    largura = max(5, len(str(n_empresas)))
+    abertura_min, abertura_max = pd.Timestamp('1994-01-01'), pd.Timestamp('2024-01-01')
+    dias_abertura = rng.integers(0, (abertura_max - abertura_min).days, n_empresas)
+    return pd.DataFrame({
+        'ID': np.array([f'CNPJ_{codigo:0{largura}d}' for codigo in range(1, n_empresas + 1)], dtype=object),
+        'VL_FATU': np.round(np.exp(rng.normal(14.27, 2.07, n_empresas)).clip(50_000)),
+        'DT_ABRT': abertura_min + pd.to_timedelta(dias_abertura, unit='D'),
+        'DS_CNAE': np.asarray(CNAES, dtype=object)[rng.integers(0, len(CNAES), n_empresas)],
+    })
+
+
+def gerar_base_id(empresas, n_meses, semente=42, ids_sujos=0.01):
+    """Base 1: um snapshot por empresa e por mês (ID;VL_FATU;VL_SLDO;DT_ABRT;DS_CNAE;DT_REFE)."""
+    rng = _gerador(semente, 1)
+    meses = meses_referencia(n_meses)
+    n_empresas = len(empresas)
+    faturamento = np.tile(empresas['VL_FATU'].to_numpy(), n_meses)
+    return pd.DataFrame({
+        'ID': _sujar_ids(np.tile(empresas['ID'].to_numpy(dtype=object), n_meses), ids_sujos, rng),
+        'VL_FATU': faturamento.astype(np.int64),
+        'VL_SLDO': np.round(faturamento * rng.uniform(-0.15, 0.15, len(faturamento))).astype(np.int64),
+        'DT_ABRT': np.tile(empresas['DT_ABRT'].dt.strftime('%Y-%m-%d').to_numpy(), n_meses),
+        'DS_CNAE': np.tile(empresas['DS_CNAE'].to_numpy(), n_meses),
+        'DT_REFE': np.repeat(meses.strftime('%Y-%m-%d').to_numpy(), n_empresas),
+    })
+
+
+def gerar_transacoes(empresas, n_meses, transacoes_por_empresa, assimetria=1.0, concentracao=0.3, semente=42, ids_sujos=0.01):
+    """Base 2, um mês por vez: gera DataFrames (ID_PGTO;ID_RCBE;VL;DS_TRAN;DT_REFE).
+
+    Cada empresa faz em média transacoes_por_empresa pagamentos por mês
+    (Poisson), com valor proporcional ao seu faturamento mensal.
+    """
+    n_empresas = len(empresas)
+    rng = _gerador(semente, 2)
+    # Popularidade dos recebedores em lei de potência, em ordem aleatória de empresas.
+    popularidade = np.empty(n_empresas)
+    popularidade[rng.permutation(n_empresas)] = 1.0 / np.arange(1, n_empresas + 1) ** assimetria
+    popularidade /= popularidade.sum()
+    parceiro_principal = rng.choice(n_empresas, n_empresas, p=popularidade)
+    ids = empresas['ID'].to_numpy(dtype=object)
+    fatu_mensal = empresas['VL_FATU'].to_numpy() / 12
+
+    for mes, dt_refe in enumerate(meses_referencia(n_meses).strftime('%Y-%m-%d')):
+        rng = _gerador(semente, 3, mes)
+        pagadores = np.repeat(np.arange(n_empresas), rng.poisson(transacoes_por_empresa, n_empresas))
+        n_linhas = len(pagadores)
+        recebedores = np.where(rng.random(n_linhas) < concentracao, parceiro_principal[pagadores], rng.choice(n_empresas, n_linhas, p=popularidade))
+        # Ninguém paga a si mesmo: desloca o recebedor para a empresa seguinte.
+        recebedores = np.where(recebedores == pagadores, (recebedores + 1) % n_empresas, recebedores)
+        valores = fatu_mensal[pagadores] * 0.5 / transacoes_por_empresa * rng.lognormal(0, 0.5, n_linhas)
+        yield pd.DataFrame({
+            'ID_PGTO': _sujar_ids(ids[pagadores], ids_sujos, rng),
+            'ID_RCBE': _sujar_ids(ids[recebedores], ids_sujos, rng),
+            'VL': np.round(valores, 2),
+            'DS_TRAN': np.asarray(TIPOS_TRANSACAO, dtype=object)[rng.choice(len(TIPOS_TRANSACAO), n_linhas, p=PROBABILIDADES_TRANSACAO)],
+            'DT_REFE': dt_refe,
+        })
+
+
+def gerar_bases(diretorio, n_empresas, n_meses=5, transacoes_por_empresa=2, assimetria=1.0, concentracao=0.3, semente=42, ids_sujos=0.01):
+    """Grava as duas bases em diretorio e devolve (arquivo_id, arquivo_transacoes, linhas_id, linhas_transacoes)."""
+    os.makedirs(diretorio, exist_ok=True)
+    arquivo_id = os.path.join(diretorio, ARQUIVO_BASE_ID)
+    arquivo_transacoes = os.path.join(diretorio, ARQUIVO_TRANSACOES)
+    empresas = gerar_empresas(n_empresas, semente)
+    base_id = gerar_base_id(empresas, n_meses, semente, ids_sujos)
+    base_id.to_csv(arquivo_id, sep=';', index=False)
+
+    linhas_transacoes = 0
+    for mes, transacoes in enumerate(gerar_transacoes(empresas, n_meses, transacoes_por_empresa, assimetria, concentracao, semente, ids_sujos)):
+        transacoes.to_csv(arquivo_transacoes, sep=';', index=False, mode='w' if mes == 0 else 'a', header=mes == 0)
+        linhas_transacoes += len(transacoes)
+    return arquivo_id, arquivo_transacoes, len(base_id), linhas_transacoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera a Base 1 e a Base 2 sintéticas, de forma determinística, em qualquer escala.")
+    escala = parser.add_mutually_exclusive_group()
+    escala.add_argument('--empresas', type=int, default=10_000, help="Número de empresas (padrão: 10000, como a amostra).")
+    escala.add_argument('--linhas', type=int, default=None, help="Número aproximado de transações; o número de empresas é derivado dele.")
+    parser.add_argument('--meses', type=int, default=5, help="Meses de histórico (snapshots e transações) a partir de 2025-01.")
+    parser.add_argument('--transacoes-por-empresa', type=float, default=2, help="Média de pagamentos por empresa e por mês.")
+    parser.add_argument('--assimetria', type=float, default=1.0, help="Expoente da popularidade dos recebedores (0 = uniforme, 1 = Zipf).")
+    parser.add_argument('--concentracao', type=float, default=0.3, help="Fração dos pagamentos de cada empresa destinada ao seu parceiro principal.")
+    parser.add_argument('--ids-sujos', type=float, default=0.01, help="Fração de IDs gravados em minúsculas ou com espaços.")
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--saida', default='dados_sinteticos', help="Diretório onde as bases são gravadas.")
+    args = parser.parse_args()
+
+    n_empresas = args.empresas if args.linhas is None else empresas_para_linhas(args.linhas, args.meses, args.transacoes_por_empresa)
+    _, _, linhas_id, linhas_transacoes = gerar_bases(args.saida, n_empresas, args.meses, args.transacoes_por_empresa,
+                                                     args.assimetria, args.concentracao, args.semente, args.ids_sujos)
+    print(f"{n_empresas} empresas: Base 1 com {linhas_id} linhas e Base 2 com {linhas_transacoes} linhas gravadas em '{args.saida}'.")
+
+
+if __name__ == '__main__':
+    main()
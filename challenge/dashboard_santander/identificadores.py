@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+
+# --- DICIONÁRIO DE IDs (CÓDIGOS INTEIROS) ---
+# Os IDs chegam nas duas bases como texto com espaços e letras minúsculas. Em
+# vez de limpar cada linha e carregar strings por todo o pipeline, cada ID bruto
+# distinto é limpo uma única vez e recebe um código int32 em um dicionário
+# compartilhado pela Base 1 e pela Base 2. Junções, agregações, a rede e a
+# projeção trabalham sobre os códigos; os IDs voltam a ser texto só na gravação
+# dos resultados.
+#
+# O dicionário só cresce: IDs novos recebem os próximos códigos e os já
+# conhecidos mantêm o seu. Ele é guardado no estado incremental, de modo que os
+# agregados de execuções anteriores continuam válidos. IDs ausentes recebem o
+# código -1 e ficam fora dos agregados, como o NaN ficava no groupby.
+
+CODIGO_AUSENTE = -1
+
+
+def limpar_ids(serie):
+    return serie.astype(str).str.strip().str.upper()
+
+
+class DicionarioIds:
+    def __init__(self, ids=()):
+        self.ids = pd.Index(ids, dtype='str')
+
+    def __len__(self):
+        return len(self.ids)
+
+    def codificar(self, valores, limpos=False):
+        """Códigos int32 dos IDs; com limpos=True os valores já vêm limpos (por exemplo, do banco)."""
+        codigos_brutos, brutos = pd.factorize(pd.Series(valores, dtype='str'))
+        distintos = pd.Index(brutos if limpos else limpar_ids(pd.Series(brutos)), dtype='str')
+        codigos = self.ids.get_indexer(distintos) if len(self.ids) else np.full(len(distintos), -1, dtype=np.intp)
+        novos = codigos < 0
+        if novos.any():
+            # Brutos diferentes podem ter o mesmo ID limpo (' abc' e 'ABC'): cada ID novo entra uma única vez.
+            codigos_novos, ids_novos = pd.factorize(distintos[novos])
+            codigos[novos] = len(self.ids) + codigos_novos
+            self.ids = self.ids.append(pd.Index(ids_novos, dtype='str'))
+        return np.append(codigos, CODIGO_AUSENTE)[codigos_brutos].astype(np.int32)
+
+    def decodificar(self, codigos):
+        """IDs em texto dos códigos (NaN para o código -1)."""
+        return self.ids.array.take(np.asarray(codigos), allow_fill=True)
+
+    def decodificar_colunas(self, df, colunas):
+        """Cópia do DataFrame com as colunas de códigos convertidas de volta para os IDs em texto."""
+        return df.assign(**{coluna: self.decodificar(df[coluna].to_numpy()) for coluna in colunas if coluna in df.columns})
@@ -0,0 +1,56 @@
+import numpy as np
+
+# --- ÍNDICES DO DASHBOARD ---
+# Construídos uma única vez por carga de dados, para que cada interação nas
+# páginas individuais seja uma consulta direta em vez de varreduras completas:
+#   - histórico de cada ID já ordenado por DT_REFE, acessado por posição;
+#   - estatísticas dos pares por (DS_CNAE, MOMENTO_VIDA), das quais a própria
+#     empresa é descontada no momento da consulta.
+
+CHAVES_PARES = ['DS_CNAE', 'MOMENTO_VIDA']
+
+
+class IndiceEmpresas:
+    def __init__(self, df):
+        self.df = df.sort_values(['ID', 'DT_REFE'], kind='mergesort').reset_index(drop=True)
+        ids = self.df['ID'].to_numpy()
+        if len(ids):
+            inicio = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]])
+        else:
+            inicio = np.array([], dtype=int)
+        fim = np.r_[inicio[1:], len(ids)].astype(int)
+        self.ids = ids[inicio].tolist()
+        self._posicoes = dict(zip(self.ids, zip(inicio.tolist(), fim.tolist())))
+
+        self._grupos = self._proprios = None
+        if {'VL_FATU', 'VL_SLDO', *CHAVES_PARES} <= set(self.df.columns):
+            agregacoes = dict(SOMA_FATU=('VL_FATU', 'sum'), SOMA_SLDO=('VL_SLDO', 'sum'), N_REGISTROS=('VL_FATU', 'size'))
+            self._grupos = self.df.groupby(CHAVES_PARES, observed=True).agg(**agregacoes, N_EMPRESAS=('ID', 'nunique'))
+            self._proprios = self.df.groupby(['ID', *CHAVES_PARES], observed=True).agg(**agregacoes)
+
+    def historico(self, id_empresa):
+        """Registros do ID ordenados por DT_REFE (fatia do DataFrame ordenado, sem varredura)."""
+        inicio, fim = self._posicoes[id_empresa]
+        return self.df.iloc[inicio:fim]
+
+    def ultimo_registro(self, id_empresa):
+        return self.df.iloc[self._posicoes[id_empresa][1] - 1]
+
+    def estatisticas_pares(self, id_empresa, cnae, momento):
+        """Médias de VL_FATU e VL_SLDO e nº de empresas com o mesmo CNAE e momento de vida, sem a própria empresa.
+
+        Devolve None quando não há pares para comparação.
+        """
+        if (cnae, momento) not in self._grupos.index:
+            return None
+        grupo = self._grupos.loc[(cnae, momento)]
+        soma_fatu, soma_sldo, n_registros, n_empresas = grupo['SOMA_FATU'], grupo['SOMA_SLDO'], grupo['N_REGISTROS'], grupo['N_EMPRESAS']
+        if (id_empresa, cnae, momento) in self._proprios.index:
+            proprio = self._proprios.loc[(id_empresa, cnae, momento)]
+            soma_fatu -= proprio['SOMA_FATU']
+            soma_sldo -= proprio['SOMA_SLDO']
+            n_registros -= proprio['N_REGISTROS']
+            n_empresas -= 1
+        if n_registros == 0:
+            return None
+        return {'VL_FATU_MEDIO': soma_fatu / n_registros, 'VL_SLDO_MEDIO': soma_sldo / n_registros, 'N_EMPRESAS': int(n_empresas)}
@@ -0,0 +1,52 @@
+import pandas as pd
+from agregados import agregar_transacoes, reduzir_agregados
+
+# --- LEITURA E PREPARAÇÃO DAS BASES ---
+# A Base 2 pode ser lida inteira ou em blocos de tamanho fixo. No modo em blocos
+# cada bloco é limpo, agregado e descartado: a memória fica limitada ao número
+# de chaves distintas (empresas, pares e meses), e não ao número de transações.
+# Os agregados parciais dos blocos são somados em lotes de BLOCOS_POR_REDUCAO
+# (um único concat + groupby por lote), e não realinhados a cada bloco.
+# Os IDs das duas bases são trocados pelos códigos do mesmo DicionarioIds.
+
+BLOCOS_POR_REDUCAO = 16
+
+
+def preparar_base_id(df_id, dicionario_ids):
+    df_id = df_id.copy()
+    df_id['ID'] = dicionario_ids.codificar(df_id['ID'])
+    df_id['DT_REFE'] = pd.to_datetime(df_id['DT_REFE'], errors='coerce')
+    df_id['DT_ABRT'] = pd.to_datetime(df_id['DT_ABRT'], errors='coerce')
+    df_id['IDADE_EMPRESA'] = (df_id['DT_REFE'] - df_id['DT_ABRT']).dt.days / 365.25
+    return df_id
+
+
+def preparar_transacoes(df_transacoes, dicionario_ids):
+    df_transacoes = df_transacoes.copy()
+    df_transacoes['ID_PGTO'] = dicionario_ids.codificar(df_transacoes['ID_PGTO'])
+    df_transacoes['ID_RCBE'] = dicionario_ids.codificar(df_transacoes['ID_RCBE'])
+    df_transacoes['DT_REFE'] = pd.to_datetime(df_transacoes['DT_REFE'], errors='coerce')
+    df_transacoes['MES_ANO'] = df_transacoes['DT_REFE'].dt.to_period('M')
+    return df_transacoes
+
+
+def agregar_em_blocos(arquivo_transacoes, tamanho_bloco, dicionario_ids, ao_processar_bloco=None):
+    """Lê a Base 2 em blocos e acumula os agregados parciais de cada um.
+
+    ao_processar_bloco(numero, bloco) é chamado com cada bloco já preparado, por
+    exemplo para gravá-lo como uma parte do artefato de transações.
+    Devolve os agregados combinados e o total de linhas lidas.
+    """
+    parciais = []
+    total_linhas = 0
+    for numero, bloco in enumerate(pd.read_csv(arquivo_transacoes, sep=';', chunksize=tamanho_bloco)):
+        bloco = preparar_transacoes(bloco, dicionario_ids)
+        parciais.append(agregar_transacoes(bloco, com_cubo=False))
+        if len(parciais) > BLOCOS_POR_REDUCAO:
+            parciais = [reduzir_agregados(parciais)]
+        total_linhas += len(bloco)
+        if ao_processar_bloco is not None:
+            ao_processar_bloco(numero, bloco)
+    if not parciais:
+        return agregar_transacoes(preparar_transacoes(pd.read_csv(arquivo_transacoes, sep=';'), dicionario_ids), com_cubo=False), total_linhas
+    return reduzir_agregados(parciais), total_linhas
@@ -0,0 +1,63 @@
+import numpy as np
+
+# --- MOTOR DE INSIGHTS COMERCIAIS (EM LOTE) ---
+# As regras que antes rodavam no dashboard, uma empresa por vez, são avaliadas
+# de forma vetorizada para toda a carteira. O resultado é uma tabela com uma
+# linha por empresa (último snapshot + saldo médio do histórico), uma coluna
+# booleana por insight e uma pontuação que ordena a lista de prospecção.
+
+ARTEFATO_OPORTUNIDADES = 'oportunidades.arrow'
+LIMITE_DEPENDENCIA = 0.4
+QUANTIL_HUB = 0.85
+
+# Peso de cada insight na pontuação de prioridade comercial.
+PESOS_INSIGHTS = {
+    'FLUXO_CAIXA_NEGATIVO': 3,
+    'OTIMIZACAO_CAIXA': 2,
+    'RISCO_CONCENTRACAO': 2,
+    'EMPRESA_HUB': 2,
+    'APOIO_CRESCIMENTO': 1,
+}
+INSIGHTS = list(PESOS_INSIGHTS)
+
+
+def gerar_oportunidades(df_final):
+    """Avalia todas as regras para todas as empresas de uma vez e devolve a tabela priorizada."""
+    ordenado = df_final.sort_values(['ID', 'DT_REFE'], kind='mergesort')
+    ultimos = ordenado.groupby('ID', sort=False).tail(1).set_index('ID')
+    oportunidades = ultimos[['DT_REFE', 'DS_CNAE', 'MOMENTO_VIDA', 'VL_FATU', 'NIVEL_DEPENDENCIA', 'CENTRALIDADE']].copy()
+    oportunidades['SALDO_MEDIO'] = ordenado.groupby('ID', sort=False)['VL_SLDO'].mean()
+
+    limite_hub = df_final['CENTRALIDADE'].quantile(QUANTIL_HUB)
+    saldo_medio = oportunidades['SALDO_MEDIO']
+    oportunidades['FLUXO_CAIXA_NEGATIVO'] = saldo_medio < 0
+    oportunidades['OTIMIZACAO_CAIXA'] = ~oportunidades['FLUXO_CAIXA_NEGATIVO'] & (saldo_medio < (oportunidades['VL_FATU'] / 12 * 0.5))
+    oportunidades['RISCO_CONCENTRACAO'] = oportunidades['NIVEL_DEPENDENCIA'] > LIMITE_DEPENDENCIA
+    oportunidades['EMPRESA_HUB'] = oportunidades['CENTRALIDADE'] > limite_hub
+    oportunidades['APOIO_CRESCIMENTO'] = oportunidades['MOMENTO_VIDA'] == 'Em Crescimento'
+
+    flags = oportunidades[INSIGHTS].to_numpy()
+    oportunidades['N_OPORTUNIDADES'] = flags.sum(axis=1)
+    oportunidades['PONTUACAO'] = flags @ np.array([PESOS_INSIGHTS[nome] for nome in INSIGHTS])
+    oportunidades = oportunidades.sort_values(['PONTUACAO', 'VL_FATU'], ascending=[False, False], kind='mergesort')
+    oportunidades['PRIORIDADE'] = np.arange(1, len(oportunidades) + 1)
+    return oportunidades.reset_index()
+
+
+def textos_insights(empresa):
+    """Monta os textos exibidos no dashboard a partir de uma linha já calculada da tabela de oportunidades."""
+    insights = []
+    saldo_medio = empresa['SALDO_MEDIO']
+    if empresa['FLUXO_CAIXA_NEGATIVO']:
+        insights.append(f"**Ponto de Atenção: Fluxo de Caixa Negativo**\n\n- O saldo médio da empresa nos últimos meses foi de **R$ {saldo_medio:,.2f}**. Isso indica uma forte necessidade de capital de giro.\n\n- **Produto Sugerido:** Oferta proativa de **Capital de Giro** com taxas competitivas para estabilizar o fluxo de caixa.")
+    elif empresa['OTIMIZACAO_CAIXA']:
+        insights.append(f"**Oportunidade: Otimização de Caixa**\n\n- A empresa opera com um saldo médio de **R$ {saldo_medio:,.2f}**, que é relativamente baixo para seu faturamento.\n\n- **Produto Sugerido:** Apresentar soluções de **Gestão de Caixa (Cash Management)** e **Investimentos de Curto Prazo**.")
+    if empresa['RISCO_CONCENTRACAO']:
+        insights.append(f"**Risco de Concentração**\n\n- **{empresa['NIVEL_DEPENDENCIA']:.1%}** das transações da empresa estão concentradas em um único parceiro comercial.\n\n- **Argumento de Venda:** Posicionar o banco como um parceiro estratégico para mitigar riscos, oferecendo **Seguro de Crédito** ou consultoria para **diversificação de recebíveis**.")
+    if empresa['EMPRESA_HUB']:
+        insights.append(f"**Oportunidade Estratégica: Empresa-Hub**\n\n- Esta empresa é um **hub** em sua rede, com alta conectividade.\n\n- **Produto Sugerido:** Oferta de **Plataforma de Pagamentos Automatizados** e **Gestão de Cobranças**.")
+    if empresa['APOIO_CRESCIMENTO']:
+        insights.append(f"**Apoio ao Crescimento**\n\n- A empresa está classificada como 'Em Crescimento', indicando uma fase de expansão que demanda investimentos.\n\n- **Produto Sugerido:** Linhas de crédito para **investimento em ativos (FINAME, BNDES)**.")
+    if not insights:
+        insights.append("**Perfil Estável**\n\n- A empresa apresenta um perfil financeiro estável. O foco da abordagem deve ser no **relacionamento e na oferta de produtos que superem a concorrência**.")
+    return insights
@@ -0,0 +1,112 @@
+import cProfile
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# --- MÉTRICAS DE DESEMPENHO POR ETAPA ---
+# Cada etapa medida gera uma linha JSON em ARQUIVO_METRICAS com tempo de parede,
+# tempo de CPU, pico de memória (RSS) do processo e linhas de entrada/saída.
+# Todas as linhas de uma execução compartilham o mesmo identificador, o que
+# permite comparar execuções e encontrar regressões sem ler o log.
+# Opcionalmente, uma etapa pode ser perfilada com cProfile: o arquivo
+# perfil_<etapa>.prof abre no snakeviz, e o flameprof gera o flamegraph dele.
+
+ARQUIVO_METRICAS = 'metricas.jsonl'
+
+_configuracao = {
+    'arquivo': ARQUIVO_METRICAS,
+    'origem': 'analise',
+    'execucao': f"{datetime.now():%Y%m%dT%H%M%S}-{os.getpid()}",
+    'perfilar': None,
+    'ativo': True,
+    'contexto': {},
+}
+
+
+def configurar_metricas(arquivo=ARQUIVO_METRICAS, origem='analise', perfilar=None, ativo=True, contexto=None):
+    """contexto: campos fixos (por exemplo a escala de um benchmark) acrescentados a todas as linhas."""
+    _configuracao.update(
+        arquivo=arquivo,
+        origem=origem,
+        perfilar=perfilar,
+        ativo=ativo,
+        contexto=dict(contexto or {}),
+        execucao=f"{datetime.now():%Y%m%dT%H%M%S}-{os.getpid()}",
+    )
+
+
+def exportar_configuracao():
+    """Cópia da configuração atual, para que processos auxiliares gravem na mesma execução."""
+    return dict(_configuracao, contexto=dict(_configuracao['contexto']))
+
+
+def importar_configuracao(configuracao):
+    _configuracao.update(configuracao)
+
+
+def pico_rss_mb():
+    """Pico de memória residente do processo até agora, em MB (None se não houver como medir)."""
+    if resource is not None:
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss vem em KB no Linux e em bytes no macOS.
+        return pico / (1024 * 1024) if sys.platform == 'darwin' else pico / 1024
+    if psutil is not None:
+        memoria = psutil.Process().memory_info()
+        return getattr(memoria, 'peak_wset', memoria.rss) / (1024 * 1024)
+    return None
+
+
+def iniciar_etapa(etapa, linhas_entrada=None):
+    medicao = {
+        'etapa': etapa,
+        'linhas_entrada': linhas_entrada,
+        'inicio': datetime.now().isoformat(timespec='seconds'),
+        'pico_rss_inicio_mb': pico_rss_mb(),
+        'perfil': None,
+    }
+    if _configuracao['ativo'] and _configuracao['perfilar'] == etapa:
+        medicao['perfil'] = cProfile.Profile()
+        medicao['perfil'].enable()
+    medicao['_parede'] = time.perf_counter()
+    medicao['_cpu'] = time.process_time()
+    return medicao
+
+
+def finalizar_etapa(medicao, linhas_saida=None, **extras):
+    """Fecha a medição, grava a linha no arquivo de métricas e devolve o registro."""
+    tempo_parede = time.perf_counter() - medicao['_parede']
+    tempo_cpu = time.process_time() - medicao['_cpu']
+    if medicao['perfil'] is not None:
+        medicao['perfil'].disable()
+        medicao['perfil'].dump_stats(f"perfil_{medicao['etapa']}.prof")
+
+    pico_fim = pico_rss_mb()
+    registro = {
+        'execucao': _configuracao['execucao'],
+        'origem': _configuracao['origem'],
+        **_configuracao['contexto'],
+        'etapa': medicao['etapa'],
+        'inicio': medicao['inicio'],
+        'tempo_parede_s': round(tempo_parede, 6),
+        'tempo_cpu_s': round(tempo_cpu, 6),
+        'pico_rss_mb': None if pico_fim is None else round(pico_fim, 2),
+        'aumento_pico_rss_mb': None if pico_fim is None else round(pico_fim - medicao['pico_rss_inicio_mb'], 2),
+        'linhas_entrada': medicao['linhas_entrada'],
+        'linhas_saida': linhas_saida,
+        **extras,
+    }
+    if _configuracao['ativo']:
+        with open(_configuracao['arquivo'], 'a', encoding='utf-8') as arquivo:
+            arquivo.write(json.dumps(registro, ensure_ascii=False, default=str) + '\n')
+    return registro
@@ -0,0 +1,60 @@
+import json
+import numpy as np
+from sklearn.cluster import KMeans
+from sklearn.preprocessing import StandardScaler
+
+# --- MODELO DE MOMENTO DE VIDA (PERSISTENTE) ---
+# O modelo salvo contém tudo o que é preciso para classificar novos snapshots
+# sem retreinar: média e escala do StandardScaler, centróides do K-Means (no
+# espaço padronizado) e o rótulo de cada cluster. Os rótulos são atribuídos
+# pela ordem do VL_FATU médio de cada centróide, e ficam fixos até o próximo
+# treino, evitando que MOMENTO_VIDA mude de uma execução para outra.
+
+ARQUIVO_MODELO = 'modelo_momento_vida.json'
+FEATURES = ['VL_FATU', 'VL_SLDO', 'IDADE_EMPRESA', 'VL_PAGAMENTOS', 'VL_RECEBIMENTOS']
+ROTULOS = ['Pequeno Porte', 'Em Crescimento', 'Consolidada', 'Grande Porte']
+
+
+def _montar_modelo(scaler, centroides):
+    # O VL_FATU de cada centróide, de volta à escala original, é a média de
+    # faturamento do cluster; a ordem crescente define os rótulos.
+    fatu_centroides = centroides[:, 0] * scaler.scale_[0] + scaler.mean_[0]
+    ordem = np.argsort(fatu_centroides, kind='stable')
+    rotulos = [None] * len(ordem)
+    for posicao, cluster in enumerate(ordem):
+        rotulos[cluster] = ROTULOS[posicao]
+    return {
+        'features': FEATURES,
+        'media': scaler.mean_.tolist(),
+        'escala': scaler.scale_.tolist(),
+        'centroides': centroides.tolist(),
+        'rotulos': rotulos,
+    }
+
+
+def treinar_modelo(df, n_clusters=len(ROTULOS)):
+    """Treino completo em memória (StandardScaler + KMeans com n_init=10), como no PASSO 2 original."""
+    scaler = StandardScaler()
+    X_scaled = scaler.fit_transform(df[FEATURES])
+    kmeans = KMeans(n_clusters=n_clusters, random_state=42, n_init=10)
+    kmeans.fit(X_scaled)
+    return _montar_modelo(scaler, kmeans.cluster_centers_)
+
+
+def prever(modelo, df):
+    """Atribui CLUSTER e MOMENTO_VIDA com uma única conta vetorizada de distâncias aos centróides."""
+    X = (df[modelo['features']].to_numpy(dtype=float) - np.asarray(modelo['media'])) / np.asarray(modelo['escala'])
+    centroides = np.asarray(modelo['centroides'])
+    distancias = (X ** 2).sum(axis=1)[:, None] - 2 * X @ centroides.T + (centroides ** 2).sum(axis=1)[None, :]
+    clusters = distancias.argmin(axis=1).astype(np.int32)
+    return clusters, np.asarray(modelo['rotulos'], dtype=object)[clusters]
+
+
+def salvar_modelo(modelo, caminho=ARQUIVO_MODELO):
+    with open(caminho, 'w', encoding='utf-8') as arquivo:
+        json.dump(modelo, arquivo, ensure_ascii=False, indent=2)
+
+
+def carregar_modelo(caminho=ARQUIVO_MODELO):
+    with open(caminho, encoding='utf-8') as arquivo:
+        return json.load(arquivo)
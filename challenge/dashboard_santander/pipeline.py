@@ -0,0 +1,196 @@
+import glob
+import hashlib
+import inspect
+import json
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+import pandas as pd
+from metricas import exportar_configuracao, finalizar_etapa, importar_configuracao, iniciar_etapa
+
+# --- ORQUESTRADOR DE ETAPAS (DAG) COM CACHE POR CONTEÚDO ---
+# O pipeline é declarado como uma lista de etapas, cada uma com suas entradas
+# (entradas brutas ou saídas de outras etapas) e seus parâmetros. As etapas sem
+# dependência entre si rodam ao mesmo tempo em um pool de processos; as etapas
+# leves (em_paralelo=False) rodam no processo principal, evitando copiar dados
+# para os processos auxiliares.
+#
+# A saída de cada etapa é gravada em DIRETORIO_CACHE com uma chave que combina
+# o nome e a versão da etapa, o hash do código-fonte da função da etapa, o hash
+# dos parâmetros e o hash de cada entrada. Entradas brutas são identificadas
+# pelo conteúdo; saídas de outras etapas, pela chave da etapa que as produziu.
+# Assim as chaves de todo o DAG são conhecidas antes de executar qualquer etapa,
+# e a mudança de um parâmetro ou da função refaz apenas a etapa afetada e as que
+# dependem dela (mudanças em funções chamadas pela etapa ainda pedem que a
+# versão seja incrementada). Só a última chave de cada etapa fica no diretório:
+# as anteriores são apagadas ao gravar a nova. Etapas baratas (cache=False, em
+# geral as que rodam no processo principal) não são gravadas; recalculá-las
+# custa menos que ler e escrever uma cópia da saída.
+
+DIRETORIO_CACHE = 'cache_etapas'
+
+
+class Etapa:
+    def __init__(self, nome, funcao, entradas=(), parametros=None, versao=1, em_paralelo=True, metrica=None, cache=True):
+        self.nome = nome
+        self.funcao = funcao
+        self.entradas = tuple(entradas)
+        self.parametros = dict(parametros or {})
+        self.versao = versao
+        self.em_paralelo = em_paralelo
+        self.metrica = metrica or nome
+        self.cache = cache
+
+
+def hash_conteudo(objeto):
+    """Hash estável do conteúdo de um DataFrame, Series ou valor serializável em JSON."""
+    resumo = hashlib.sha256()
+    if isinstance(objeto, (pd.DataFrame, pd.Series)):
+        colunas = list(objeto.columns) if isinstance(objeto, pd.DataFrame) else [objeto.name]
+        tipos = objeto.dtypes.astype(str).tolist() if isinstance(objeto, pd.DataFrame) else [str(objeto.dtype)]
+        resumo.update(json.dumps([type(objeto).__name__, colunas, tipos, list(objeto.index.names)], default=str).encode())
+        resumo.update(pd.util.hash_pandas_object(objeto, index=True).to_numpy().tobytes())
+    else:
+        resumo.update(json.dumps(objeto, sort_keys=True, default=str).encode())
+    return resumo.hexdigest()
+
+
+def hash_codigo(funcao):
+    """Hash do código-fonte da função (ou do seu nome, se o código não estiver disponível)."""
+    try:
+        codigo = inspect.getsource(funcao)
+    except (OSError, TypeError):
+        codigo = f'{funcao.__module__}.{funcao.__qualname__}'
+    return hashlib.sha256(codigo.encode()).hexdigest()
+
+
+def calcular_chaves(etapas, hashes_entradas):
+    """Chave de cache de cada etapa, em ordem topológica (levanta ValueError se houver ciclo ou entrada desconhecida)."""
+    por_nome = {etapa.nome: etapa for etapa in etapas}
+    chaves = {}
+    visitando = set()
+
+    def chave(nome):
+        if nome in chaves:
+            return chaves[nome]
+        if nome in visitando:
+            raise ValueError(f"Ciclo no pipeline envolvendo a etapa '{nome}'.")
+        visitando.add(nome)
+        etapa = por_nome[nome]
+        origens = {}
+        for entrada in etapa.entradas:
+            if entrada in por_nome:
+                origens[entrada] = chave(entrada)
+            elif entrada in hashes_entradas:
+                origens[entrada] = hashes_entradas[entrada]
+            else:
+                raise ValueError(f"Entrada '{entrada}' da etapa '{nome}' não foi fornecida.")
+        chaves[nome] = hash_conteudo({'etapa': nome, 'versao': etapa.versao, 'codigo': hash_codigo(etapa.funcao),
+                                      'parametros': etapa.parametros, 'entradas': origens})
+        visitando.discard(nome)
+        return chaves[nome]
+
+    for etapa in etapas:
+        chave(etapa.nome)
+    return chaves
+
+
+def _executar_etapa(etapa, argumentos, configuracao_metricas=None):
+    """Roda uma etapa medindo-a; é o que cada processo do pool executa."""
+    if configuracao_metricas is not None:
+        importar_configuracao(configuracao_metricas)
+    linhas_entrada = len(argumentos[0]) if argumentos and isinstance(argumentos[0], (pd.DataFrame, pd.Series)) else None
+    medicao = iniciar_etapa(etapa.metrica, linhas_entrada=linhas_entrada)
+    resultado = etapa.funcao(*argumentos, **etapa.parametros)
+    linhas_saida = len(resultado) if isinstance(resultado, (pd.DataFrame, pd.Series)) else None
+    registro = finalizar_etapa(medicao, linhas_saida=linhas_saida, cache='executada', processo=os.getpid())
+    return resultado, registro
+
+
+def _caminho_cache(diretorio_cache, nome, chave):
+    return os.path.join(diretorio_cache, f'{nome}-{chave[:24]}.pkl')
+
+
+def _descartar_antigos(diretorio_cache, nome, chave):
+    """Apaga as saídas em cache da etapa com outras chaves, mantendo só a atual."""
+    atual = _caminho_cache(diretorio_cache, nome, chave)
+    for caminho in glob.glob(os.path.join(diretorio_cache, f'{nome}-{"?" * 24}.pkl')):
+        if caminho != atual:
+            os.remove(caminho)
+
+
+def executar_dag(etapas, entradas, alvos=None, processos=None, diretorio_cache=DIRETORIO_CACHE, usar_cache=True, ao_concluir=None):
+    """Executa as etapas necessárias para obter os alvos e devolve {nome: saída} para cada alvo.
+
+    entradas: dicionário com as entradas brutas (DataFrames, Series).
+    processos: tamanho do pool; 1 roda tudo em sequência no processo principal.
+    ao_concluir(etapa, registro, reaproveitada) é chamado quando cada etapa termina.
+    """
+    por_nome = {etapa.nome: etapa for etapa in etapas}
+    alvos = list(alvos or [etapas[-1].nome])
+    processos = processos or os.cpu_count() or 1
+    usadas = {entrada for etapa in etapas for entrada in etapa.entradas}
+    chaves = calcular_chaves(etapas, {nome: hash_conteudo(valor) for nome, valor in entradas.items() if nome in usadas})
+    em_cache = {nome for nome, chave in chaves.items()
+                if usar_cache and por_nome[nome].cache and os.path.exists(_caminho_cache(diretorio_cache, nome, chave))}
+
+    # Do alvo para trás: uma etapa em cache só é lida se algum consumidor precisar rodar.
+    executar, ler = set(), set()
+    pendentes = list(alvos)
+    while pendentes:
+        nome = pendentes.pop()
+        if nome in executar or nome in ler:
+            continue
+        if nome in em_cache:
+            ler.add(nome)
+            continue
+        executar.add(nome)
+        pendentes.extend(entrada for entrada in por_nome[nome].entradas if entrada in por_nome)
+
+    resultados = dict(entradas)
+    for nome in sorted(ler, key=list(por_nome).index):
+        medicao = iniciar_etapa(por_nome[nome].metrica)
+        resultados[nome] = pd.read_pickle(_caminho_cache(diretorio_cache, nome, chaves[nome]))
+        registro = finalizar_etapa(medicao, cache='reaproveitada', chave=chaves[nome][:24])
+        if ao_concluir is not None:
+            ao_concluir(por_nome[nome], registro, True)
+
+    def concluir(etapa, resultado, registro):
+        resultados[etapa.nome] = resultado
+        if usar_cache and etapa.cache:
+            os.makedirs(diretorio_cache, exist_ok=True)
+            caminho = _caminho_cache(diretorio_cache, etapa.nome, chaves[etapa.nome])
+            pd.to_pickle(resultado, caminho + '.tmp')
+            os.replace(caminho + '.tmp', caminho)
+            _descartar_antigos(diretorio_cache, etapa.nome, chaves[etapa.nome])
+        if ao_concluir is not None:
+            ao_concluir(etapa, registro, False)
+
+    faltando = [etapa for etapa in etapas if etapa.nome in executar]
+    pool = None
+    em_execucao = {}
+    try:
+        while faltando or em_execucao:
+            prontas = [etapa for etapa in faltando if all(entrada in resultados for entrada in etapa.entradas)]
+            for etapa in prontas:
+                if etapa.em_paralelo and processos > 1:
+                    if pool is None:
+                        pool = ProcessPoolExecutor(max_workers=min(processos, len(faltando)))
+                    argumentos = [resultados[entrada] for entrada in etapa.entradas]
+                    em_execucao[pool.submit(_executar_etapa, etapa, argumentos, exportar_configuracao())] = etapa
+                    faltando.remove(etapa)
+            # As etapas do processo principal rodam enquanto o pool trabalha.
+            locais = [etapa for etapa in prontas if etapa in faltando]
+            if locais:
+                etapa = locais[0]
+                faltando.remove(etapa)
+                concluir(etapa, *_executar_etapa(etapa, [resultados[entrada] for entrada in etapa.entradas]))
+                continue
+            if not em_execucao:
+                raise ValueError(f"Etapas sem entradas disponíveis: {[etapa.nome for etapa in faltando]}")
+            terminadas, _ = wait(em_execucao, return_when=FIRST_COMPLETED)
+            for futuro in terminadas:
+                concluir(em_execucao.pop(futuro), *futuro.result())
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+    return {nome: resultados[nome] for nome in alvos}
@@ -0,0 +1,78 @@
+import pandas as pd
+
+# --- MOTOR DE PROJEÇÃO DE RECEBIMENTOS (VETORIZADO) ---
+# As regras de projeção recebem um resumo por empresa (um registro por ID_RCBE)
+# com as colunas N_MESES, MES_PENULTIMO, VL_PENULTIMO, MES_ULTIMO e VL_ULTIMO, e
+# devolvem uma Series indexada por ID_RCBE. Nenhuma regra deve iterar empresa
+# por empresa. O mesmo resumo é mantido entre execuções no modo incremental.
+
+REGRAS_PROJECAO = {}
+
+
+def registrar_regra(nome):
+    """Registra uma função de projeção em REGRAS_PROJECAO com o nome informado."""
+    def decorador(funcao):
+        REGRAS_PROJECAO[nome] = funcao
+        return funcao
+    return decorador
+
+
+def resumir_ultimos_meses(recebimentos_mensais):
+    """Ordena uma única vez por (ID_RCBE, MES_ANO) e extrai os dois últimos meses de cada empresa."""
+    ordenado = recebimentos_mensais.sort_values(['ID_RCBE', 'MES_ANO'], kind='mergesort')
+    grupos = ordenado.groupby('ID_RCBE', sort=False)
+    ordenado = ordenado.assign(MES_PENULTIMO=grupos['MES_ANO'].shift(1), VL_PENULTIMO=grupos['VL'].shift(1))
+    resumo = ordenado.groupby('ID_RCBE', sort=False).tail(1).set_index('ID_RCBE')
+    resumo = resumo.rename(columns={'MES_ANO': 'MES_ULTIMO', 'VL': 'VL_ULTIMO'})
+    resumo = resumo[['MES_PENULTIMO', 'VL_PENULTIMO', 'MES_ULTIMO', 'VL_ULTIMO']]
+    resumo.insert(0, 'N_MESES', grupos.size())
+    return resumo
+
+
+def atualizar_resumo(resumo, recebimentos_mensais_novos):
+    """Incorpora meses novos a um resumo existente sem precisar do histórico completo.
+
+    Os meses novos não podem ser anteriores ao penúltimo mês já resumido de cada
+    empresa, pois os meses mais antigos só existem como contagem em N_MESES.
+    """
+    novos = recebimentos_mensais_novos.merge(resumo[['MES_PENULTIMO', 'MES_ULTIMO']], left_on='ID_RCBE', right_index=True, how='left')
+    limite = novos['MES_PENULTIMO'].where(novos['MES_PENULTIMO'].notna(), novos['MES_ULTIMO'])
+    if (novos['MES_ANO'] < limite).any():
+        raise ValueError("Há recebimentos de meses anteriores ao histórico resumido; é necessário um recálculo completo.")
+
+    ultimos = resumo[['MES_ULTIMO', 'VL_ULTIMO']].rename(columns={'MES_ULTIMO': 'MES_ANO', 'VL_ULTIMO': 'VL'})
+    penultimos = resumo[['MES_PENULTIMO', 'VL_PENULTIMO']].dropna().rename(columns={'MES_PENULTIMO': 'MES_ANO', 'VL_PENULTIMO': 'VL'})
+    visiveis = pd.concat([penultimos, ultimos]).rename_axis('ID_RCBE').reset_index()
+    ocultos = resumo['N_MESES'] - resumo['MES_PENULTIMO'].notna() - 1
+
+    combinado = pd.concat([visiveis, recebimentos_mensais_novos[['ID_RCBE', 'MES_ANO', 'VL']]])
+    combinado = combinado.groupby(['ID_RCBE', 'MES_ANO'])['VL'].sum().reset_index()
+    novo_resumo = resumir_ultimos_meses(combinado)
+    novo_resumo['N_MESES'] += ocultos.reindex(novo_resumo.index, fill_value=0).astype(novo_resumo['N_MESES'].dtype)
+    return novo_resumo
+
+
+@registrar_regra('ponderada')
+def projecao_ponderada(resumo, peso_ultimo=0.7, peso_penultimo=0.3):
+    """Regra original: 1 mês repete o valor, 2 meses aplica a taxa de crescimento, 3+ meses média ponderada."""
+    n_meses = resumo['N_MESES']
+    ultimo = resumo['VL_ULTIMO']
+    penultimo = resumo['VL_PENULTIMO']
+
+    projecao = pd.Series(0.0, index=resumo.index)
+    projecao[n_meses == 1] = ultimo
+    dois_meses = n_meses == 2
+    com_crescimento = dois_meses & (penultimo > 0)
+    projecao[com_crescimento] = ultimo * (ultimo / penultimo)
+    projecao[dois_meses & ~com_crescimento] = ultimo
+    tres_ou_mais = n_meses >= 3
+    projecao[tres_ou_mais] = (ultimo * peso_ultimo) + (penultimo * peso_penultimo)
+    return projecao
+
+
+def projetar(resumo, regra='ponderada', **parametros):
+    """Aplica uma regra registrada a um resumo já calculado (N_MESES, VL_PENULTIMO, VL_ULTIMO)."""
+    if regra not in REGRAS_PROJECAO:
+        raise ValueError(f"Regra de projeção desconhecida: '{regra}'. Disponíveis: {sorted(REGRAS_PROJECAO)}")
+    projecao = REGRAS_PROJECAO[regra](resumo, **parametros)
+    return projecao.clip(lower=0)
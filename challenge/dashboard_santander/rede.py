@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+# --- MOTOR DE ANÁLISE DE REDE (MATRIZES ESPARSAS) ---
+# A rede de transações é representada por uma matriz de adjacência esparsa
+# (CSR) indexada por inteiros: linha = pagador, coluna = recebedor, valor = soma
+# de VL do par. Cada métrica é uma operação vetorizada sobre os arrays da
+# matriz, o que escala para dezenas de milhões de arestas sem criar um objeto
+# Python por nó ou aresta como o networkx.
+
+
+def _reduzir_por_segmento(ufunc, dados, indptr):
+    """Aplica ufunc.reduceat por linha (CSR) ou coluna (CSC); segmentos vazios ficam NaN."""
+    resultado = np.full(len(indptr) - 1, np.nan)
+    nao_vazios = np.diff(indptr) > 0
+    if nao_vazios.any():
+        resultado[nao_vazios] = ufunc.reduceat(dados, indptr[:-1][nao_vazios])
+    return resultado
+
+
+class RedeTransacoes:
+    """Rede dirigida pagador -> recebedor construída a partir dos totais por par."""
+
+    def __init__(self, pares):
+        pagadores = pares.index.get_level_values('ID_PGTO')
+        recebedores = pares.index.get_level_values('ID_RCBE')
+        codigos, self.ids = pd.factorize(np.concatenate([pagadores.to_numpy(), recebedores.to_numpy()]))
+        self.origem = codigos[:len(pares)]
+        self.destino = codigos[len(pares):]
+        n_nos = len(self.ids)
+        self.matriz = sparse.csr_array((pares.to_numpy(dtype=float), (self.origem, self.destino)), shape=(n_nos, n_nos))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _por_no(self, valores, nome):
+        return pd.Series(valores, index=self.ids, name=nome)
+
+    def centralidade_grau(self):
+        """Mesma definição de nx.degree_centrality em um DiGraph: (grau de entrada + saída) / (n - 1).
+
+        Os IDs ausentes não entram nos pares, então não são nós: no networkx eles formavam um nó NaN, que
+        também contava em n - 1.
+        """
+        n_nos = len(self)
+        if n_nos <= 1:
+            return self._por_no(np.ones(n_nos), 'CENTRALIDADE')
+        grau = np.bincount(self.origem, minlength=n_nos) + np.bincount(self.destino, minlength=n_nos)
+        return self._por_no(grau * (1.0 / (n_nos - 1)), 'CENTRALIDADE')
+
+    def dependencia(self, total_pagamentos=None, total_recebimentos=None):
+        """Maior fatia do valor pago a um único recebedor ou recebido de um único pagador.
+
+        As fatias são divididas pelos totais pagos e recebidos por empresa, quando informados. Eles incluem
+        as transações com a contraparte ausente, que não estão na matriz, como no cálculo original. Sem eles,
+        o denominador é a soma da linha ou da coluna da matriz.
+        """
+        por_pagador = self.matriz
+        por_recebedor = self.matriz.tocsc()
+        soma_pgto = _reduzir_por_segmento(np.add, por_pagador.data, por_pagador.indptr) if total_pagamentos is None else total_pagamentos.reindex(self.ids).to_numpy(dtype=float)
+        soma_rcbe = _reduzir_por_segmento(np.add, por_recebedor.data, por_recebedor.indptr) if total_recebimentos is None else total_recebimentos.reindex(self.ids).to_numpy(dtype=float)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            dep_pgto = _reduzir_por_segmento(np.maximum, por_pagador.data, por_pagador.indptr) / soma_pgto
+            dep_rcbe = _reduzir_por_segmento(np.maximum, por_recebedor.data, por_recebedor.indptr) / soma_rcbe
+        # Como no cálculo original com pandas, o lado sem transações conta como 0.
+        dependencia = np.maximum(np.where(np.isnan(dep_pgto), 0.0, dep_pgto), np.where(np.isnan(dep_rcbe), 0.0, dep_rcbe))
+        return self._por_no(dependencia, 'NIVEL_DEPENDENCIA')
+
+    def pagerank(self, amortecimento=0.85, tolerancia=1e-10, max_iteracoes=100):
+        """PageRank ponderado pelo valor dos pares, por iteração de potência sobre a matriz esparsa."""
+        n_nos = len(self)
+        if n_nos == 0:
+            return self._por_no(np.array([]), 'PAGERANK')
+        pesos = abs(self.matriz)
+        saida = np.asarray(pesos.sum(axis=1)).ravel()
+        sem_saida = saida == 0
+        transicao = sparse.diags_array(np.divide(1.0, saida, out=np.zeros(n_nos), where=~sem_saida)) @ pesos
+        rank = np.full(n_nos, 1.0 / n_nos)
+        for _ in range(max_iteracoes):
+            anterior = rank
+            rank = amortecimento * (transicao.T @ rank + anterior[sem_saida].sum() / n_nos) + (1 - amortecimento) / n_nos
+            if np.abs(rank - anterior).sum() < n_nos * tolerancia:
+                break
+        return self._por_no(rank, 'PAGERANK')